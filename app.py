@@ -8,17 +8,22 @@ Usage:
 """
 
 import streamlit as st
+import heapq
+import html
 import os
 import re
-import tempfile
-from datetime import datetime
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import pairwise
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from src.pdf_parser import PDFParser
-from src.summarizer import GeminiSummarizer, SummaryDepth
-from src.command_extractor import CommandExtractor, CommandRegistry
+from src.summarizer import GeminiSummarizer, SummaryDepth, default_requests_per_minute
+from src.command_extractor import CommandExtractor, CommandRegistry, ExtractedCommand
 from src.pdf_exporter import SummaryPDFExporter
 from src.man_page import fetch_man_page
 from src.category_parser import (
@@ -33,12 +38,17 @@ from src.category_parser import (
 from src.chapter_manager import (
     save_chapters,
     load_chapters,
+    get_chapters_path,
     update_chapter_verification,
-    update_chapter_pages,
     cache_chapter_text,
     load_cached_text,
     cache_summary,
     load_cached_summary,
+    get_summary_content_key,
+    cache_summary_by_content,
+    load_summary_by_content,
+    find_cached_summary,
+    list_cached_summaries,
     clear_cache,
     save_command_registry,
     load_command_registry,
@@ -46,7 +56,17 @@ from src.chapter_manager import (
     update_library_last_opened,
     get_library_books,
     get_book_cover,
+    get_book_cover_path,
+    get_book_pdf_path,
+    store_uploaded_pdf,
+    save_book_cover,
     remove_book_from_library,
+    save_man_summary,
+    load_all_man_summaries,
+    cache_media_bytes,
+    load_media_bytes,
+    cache_media_description,
+    load_media_descriptions,
 )
 
 # ── Page Config ──────────────────────────────────────────────────────────────
@@ -99,23 +119,193 @@ st.markdown("""
         margin-top: 0.5rem;
         line-height: 1.5;
     }
+    /* Library book titles — truncated by the browser */
+    .book-title {
+        white-space: nowrap;
+        overflow: hidden;
+        text-overflow: ellipsis;
+        max-width: 100%;
+        font-weight: 600;
+    }
+    /* Command tracking index — one grid per chapter */
+    .cmd-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fill, minmax(260px, 1fr));
+        gap: 6px 16px;
+        font-size: 0.9rem;
+        line-height: 1.4;
+    }
 </style>
 """, unsafe_allow_html=True)
 
 # ── Helper: Generate cover thumbnail from first page ─────────────────────────
 
+COVER_THUMBNAIL_PX = 200  # longest side of the rendered cover
+LIBRARY_PAGE_SIZE = 12  # books (and covers) rendered per "Load more" step
+
+
 def _generate_cover_thumbnail(parser) -> bytes | None:
     """Render the first page of a PDF as a small PNG thumbnail."""
     try:
         import fitz
         page = parser.doc[0]
-        pix = page.get_pixmap(dpi=72)
+        # Rasterize straight at thumbnail size rather than a full 72-DPI page
+        zoom = COVER_THUMBNAIL_PX / max(page.rect.width, page.rect.height)
+        pix = page.get_pixmap(
+            matrix=fitz.Matrix(zoom, zoom),
+            colorspace=fitz.csRGB,
+            alpha=False,
+        )
         return pix.tobytes("png")
     except Exception:
         return None
 
 
-def _open_book(pdf_path: str, filename: str):
+# Auto-load order when a chapter is selected: standard first, then any depth
+AUTOLOAD_DEPTHS = {
+    "standard": "🔵 Standard",
+    "detailed": "🟠 Detailed",
+    "comprehensive": "🔴 Comprehensive",
+    "brief": "🟢 Brief",
+}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _find_any_cached_summary(filename: str, chapter_idx: int) -> tuple[str, str] | None:
+    """First cached summary for a chapter as (depth, summary). Cleared on cache writes."""
+    return find_cached_summary(filename, chapter_idx, list(AUTOLOAD_DEPTHS))
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_summary_index(filename: str) -> dict[tuple[int, str], dict]:
+    """(chapter_idx, depth) -> {size} for every cached summary of a book."""
+    return list_cached_summaries(filename)
+
+
+def _invalidate_summary_caches():
+    """Drop memoized summary lookups after summaries are written or deleted."""
+    _find_any_cached_summary.clear()
+    _cached_summary_index.clear()
+
+
+@st.cache_data(show_spinner=False)
+def _cached_load_chapters(filename: str, mtime_ns: int, size: int) -> list[dict] | None:
+    """Chapters JSON for a given file version — any save changes the key."""
+    return load_chapters(filename)
+
+
+def _load_chapters(filename: str) -> list[dict] | None:
+    """Load saved chapters, reading the JSON from disk only when it changed."""
+    path = get_chapters_path(filename)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return _cached_load_chapters(filename, stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_library_books() -> list[dict]:
+    """Library listing for the home screen. Cleared whenever the library changes."""
+    return get_library_books()
+
+
+def _pdf_cache_key(parser: PDFParser) -> tuple[str, int, int]:
+    """(filename, size, mtime_ns) of the open PDF — changes if the file is replaced."""
+    stat = os.stat(parser.pdf_path)
+    return st.session_state.pdf_filename, stat.st_size, stat.st_mtime_ns
+
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _cached_sections(pdf_key: tuple, start_page: int, end_page: int, _parser: PDFParser) -> list[dict]:
+    """Sub-sections of a page range; layout analysis runs once per PDF version."""
+    return _parser.extract_sections(start_page, end_page)
+
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _cached_text_blocks(pdf_key: tuple, start_page: int, end_page: int, _parser: PDFParser) -> list[dict]:
+    """Font-annotated text blocks of a page range, extracted once per PDF version."""
+    return _parser.extract_text_blocks(start_page, end_page)
+
+
+@st.cache_resource(show_spinner=False)
+def _command_extractor() -> CommandExtractor:
+    """Shared, stateless extractor instance."""
+    return CommandExtractor()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _regex_commands(
+    pdf_filename: str, ch_idx: int, page_range: tuple[int, int], _text: str
+) -> tuple[list[ExtractedCommand], str]:
+    """Regex-extracted commands of a chapter and their Markdown table (keyed by book, chapter and pages)."""
+    extractor = _command_extractor()
+    commands = extractor.extract_from_text(_text)
+    return commands, extractor.format_commands_table(commands)
+
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _font_commands(
+    pdf_key: tuple, start_page: int, end_page: int, _parser: PDFParser
+) -> tuple[list[ExtractedCommand], str]:
+    """Font-analysis commands of a page range and their Markdown table."""
+    extractor = _command_extractor()
+    commands = extractor.extract_from_blocks(_cached_text_blocks(pdf_key, start_page, end_page, _parser))
+    return commands, extractor.format_commands_table(commands)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _detected_command_names(
+    pdf_filename: str, ch_idx: int, page_range: tuple[int, int], _text: str
+) -> list[str]:
+    """Quick-lookup command names for a chapter (text is keyed by book, chapter and pages)."""
+    commands, _ = _regex_commands(pdf_filename, ch_idx, page_range, _text)
+    return heapq.nsmallest(20, {c.command for c in commands})
+
+
+@st.cache_resource(show_spinner=False)
+def _man_page_executor() -> ThreadPoolExecutor:
+    """Worker pool for man-page lookups so fetch + summarize don't block the UI."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="man-page")
+
+
+def _fetch_and_summarize_man_page(summarizer: GeminiSummarizer, cmd: str) -> dict:
+    """Fetch and summarize one man page (runs on a worker thread — no st.* calls)."""
+    result = fetch_man_page(cmd)
+    if not result["success"]:
+        return {"status": "error", "summary": result["text"]}
+    return {
+        "status": "success",
+        "summary": summarizer.summarize_man_page(cmd, result["text"]),
+        "source": result["source"],
+        "raw": result["text"][:8000],
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def _build_summarizer(api_key: str, model_name: str, requests_per_minute: int) -> GeminiSummarizer:
+    """One Gemini client per (key, model, rate limit), shared across reruns."""
+    return GeminiSummarizer(api_key, model_name, requests_per_minute)
+
+
+def _query_text(summarizer: GeminiSummarizer, text: str) -> str:
+    """Prompt-sized chapter text, computed once per selected chapter."""
+    key = (st.session_state.pdf_filename, st.session_state.current_chapter_idx)
+    # Identity check also catches the chapter text being reloaded in place
+    if st.session_state.get("_query_text_key") != key or st.session_state.get("_query_text_src") is not text:
+        st.session_state._query_text = summarizer.truncate_for_prompt(text)
+        st.session_state._query_text_key = key
+        st.session_state._query_text_src = text
+    return st.session_state._query_text
+
+
+def _flush_chapters():
+    """Write pending chapter-table edits to disk (no-op when nothing changed)."""
+    if st.session_state.get("chapters_dirty"):
+        save_chapters(st.session_state.pdf_filename, st.session_state.chapters)
+        st.session_state.chapters_dirty = False
+
+
+def _open_book(pdf_path: str, filename: str, content_hash: str = ""):
     """
     Open a book from a PDF path — used by both upload and library re-open.
     Sets up parser, chapters, command registry, and library entry.
@@ -123,21 +313,24 @@ def _open_book(pdf_path: str, filename: str):
     from src.pdf_parser import PDFParser as _PDFParser
 
     if st.session_state.parser:
+        _flush_chapters()  # don't lose pending edits of the book being closed
         st.session_state.parser.close()
 
     st.session_state.parser = _PDFParser(pdf_path)
     st.session_state.pdf_filename = filename
+    st.session_state.book_meta = st.session_state.parser.get_metadata()
+    st.session_state.verified_count = None  # recounted for the new chapter list
 
     # Load or extract chapters
-    cached_chapters = load_chapters(filename)
+    cached_chapters = _load_chapters(filename)
     if cached_chapters:
         st.session_state.chapters = cached_chapters
     else:
+        # TOC only — the full-PDF heading scan is offered in the Chapters tab
         chapters = st.session_state.parser.extract_chapters(max_level=2)
-        if not chapters:
-            chapters = st.session_state.parser.fallback_chapter_detection()
         st.session_state.chapters = chapters
-        save_chapters(filename, chapters)
+        if chapters:
+            save_chapters(filename, chapters)
 
     # Load saved command registry
     saved_registry = load_command_registry(filename)
@@ -146,9 +339,8 @@ def _open_book(pdf_path: str, filename: str):
     else:
         st.session_state.command_registry = CommandRegistry()
 
-    # Save to library (with cover)
-    meta = st.session_state.parser.get_metadata()
-    cover = _generate_cover_thumbnail(st.session_state.parser)
+    # Save to library
+    meta = st.session_state.book_meta
     save_book_to_library(
         filename=filename,
         pdf_source_path=pdf_path,
@@ -156,8 +348,16 @@ def _open_book(pdf_path: str, filename: str):
         author=meta.get("author", "Unknown"),
         total_pages=meta.get("pages", 0),
         num_chapters=len(st.session_state.chapters),
-        cover_png_bytes=cover,
+        content_hash=content_hash,
     )
+    # Only render a cover the first time — re-opens reuse the one on disk.
+    # One thumbnail-sized page, rendered here with the book's own parser
+    # (PyMuPDF must not be used from several threads at once)
+    if not os.path.exists(get_book_cover_path(filename)):
+        cover = _generate_cover_thumbnail(st.session_state.parser)
+        if cover:
+            save_book_cover(filename, cover)
+    _cached_library_books.clear()
 
     # Reset chapter selection
     st.session_state.current_chapter_idx = None
@@ -179,6 +379,10 @@ if "chapter_text" not in st.session_state:
     st.session_state.chapter_text = ""
 if "pdf_filename" not in st.session_state:
     st.session_state.pdf_filename = ""
+if "upload_book_keys" not in st.session_state:
+    st.session_state.upload_book_keys = {}  # {(upload name, size): library book key}
+if "book_meta" not in st.session_state:
+    st.session_state.book_meta = {}
 if "summarizer" not in st.session_state:
     st.session_state.summarizer = None
 if "current_summary" not in st.session_state:
@@ -187,14 +391,28 @@ if "current_summary_depth" not in st.session_state:
     st.session_state.current_summary_depth = ""
 if "chapter_media" not in st.session_state:
     st.session_state.chapter_media = []
+if "extract_all_results" not in st.session_state:
+    st.session_state.extract_all_results = {}  # {(book, chapter idx, model): {category: markdown}}
 if "man_summaries" not in st.session_state:
-    st.session_state.man_summaries = {}  # {command: {summary, status}}
+    # {command: {summary, status}} — starts with man pages summarized in earlier sessions
+    st.session_state.man_summaries = load_all_man_summaries()
+if "man_futures" not in st.session_state:
+    st.session_state.man_futures = {}  # {command: Future} — lookups still running
+if "man_active" not in st.session_state:
+    st.session_state.man_active = None  # command whose result is shown
 if "command_registry" not in st.session_state:
     st.session_state.command_registry = CommandRegistry()
 if "category_filter" not in st.session_state:
     st.session_state.category_filter = []  # empty = show all
 if "summary_from_cache" not in st.session_state:
     st.session_state.summary_from_cache = False
+if "chapters_dirty" not in st.session_state:
+    st.session_state.chapters_dirty = False  # chapter-table edits not yet on disk
+    st.session_state.chapters_edited_at = 0.0
+if "chapter_table_version" not in st.session_state:
+    st.session_state.chapter_table_version = 0  # bumped to reset the chapter editor
+if "library_page_size" not in st.session_state:
+    st.session_state.library_page_size = LIBRARY_PAGE_SIZE
 
 # ── Sidebar — Settings & Upload ──────────────────────────────────────────────
 
@@ -223,7 +441,16 @@ with st.sidebar:
             index=0,
             help="2.5 Flash = fast & cheap. 2.5 Pro = best for complex chapters. 3.x = newest."
         )
-        st.session_state.summarizer = GeminiSummarizer(api_key, model_choice)
+        requests_per_minute = st.number_input(
+            "Requests per minute",
+            min_value=1,
+            max_value=2000,
+            value=default_requests_per_minute(model_choice),
+            step=1,
+            key=f"rpm_{model_choice}",  # each model starts at its own free-tier rate
+            help="API calls are paced to this rate. Defaults to the model's free-tier quota — raise it for paid keys.",
+        )
+        st.session_state.summarizer = _build_summarizer(api_key, model_choice, int(requests_per_minute))
         st.success("✅ API key loaded from .env")
     else:
         st.info("Add GEMINI_API_KEY to your .env file or paste it above")
@@ -239,18 +466,22 @@ with st.sidebar:
     )
 
     if uploaded_file:
-        # Save to temp file and open
-        if st.session_state.pdf_filename != uploaded_file.name:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(uploaded_file.getbuffer())
-                tmp_path = tmp.name
-
-            _open_book(tmp_path, uploaded_file.name)
+        # Books are keyed by content, not upload name — a renamed copy of a
+        # stored book reopens with its caches, and same-named PDFs don't collide
+        upload_id = (uploaded_file.name, uploaded_file.size)
+        book_key = st.session_state.upload_book_keys.get(upload_id)
+        if st.session_state.pdf_filename != book_key:
+            content_hash = ""
+            if book_key is None or not os.path.exists(get_book_pdf_path(book_key)):
+                book_key, _, content_hash = store_uploaded_pdf(uploaded_file, uploaded_file.name)
+                st.session_state.upload_book_keys[upload_id] = book_key
+
+            _open_book(get_book_pdf_path(book_key), book_key, content_hash)
             st.success(f"📖 Loaded {len(st.session_state.chapters)} chapters")
 
         # Show book info
         if st.session_state.parser:
-            meta = st.session_state.parser.get_metadata()
+            meta = st.session_state.book_meta
             st.markdown(f"**{meta['title']}**")
             st.caption(f"Author: {meta['author']} • {meta['pages']} pages")
 
@@ -260,13 +491,66 @@ with st.sidebar:
     if st.session_state.pdf_filename:
         if st.button("🗑️ Clear Cache", help="Remove all cached data for this book"):
             clear_cache(st.session_state.pdf_filename)
+            _invalidate_summary_caches()
+            st.session_state.chapters_dirty = False  # nothing left to save
             st.session_state.chapters = []
             st.session_state.current_chapter_idx = None
             st.session_state.chapter_text = ""
             st.rerun()
 
+# ── Helper: Media storage ────────────────────────────────────────────────────
+# chapter_media entries keep a content hash + disk path instead of raw bytes;
+# bytes are read back only when an image is drawn or exported.
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _cached_media_bytes(path: str) -> bytes:
+    """One shared bytes object per stored image (paths are content-addressed, never stale)."""
+    data = load_media_bytes(path)
+    if data is None:
+        # Raised, not returned, so a missing file isn't cached
+        raise FileNotFoundError(path)
+    return data
+
+
+def _load_media_bytes(media: dict) -> bytes:
+    """Image bytes for a chapter_media entry (empty if the file is gone)."""
+    try:
+        return _cached_media_bytes(media["path"])
+    except FileNotFoundError:
+        return b""
+
+
 # ── Helper: Display summary with inline media ──────────────────────────────────
 
+# Compiled once — the summary is re-rendered on every rerun
+_SECTION_HEADING_RE = re.compile(r'^## ', re.MULTILINE)
+_NON_BLANK_RE = re.compile(r'\S')
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _filtered_summary_text(summary_text: str, selected_tags: tuple[str, ...]) -> str:
+    """Summary markdown restricted to the selected category tags."""
+    sections = parse_categorized_summary(summary_text)
+    return rebuild_summary_text(filter_sections(sections, list(selected_tags)))
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _category_badges(summary_text: str, selected_tags: tuple[str, ...]) -> str:
+    """Per-category section counts, struck through when filtered out."""
+    sections = parse_categorized_summary(summary_text)
+    cat_counts = Counter(s.category_tag for s in sections)
+
+    badge_parts = []
+    for tag in get_active_categories(sections):
+        icon = get_category_icon(tag)
+        name = get_category_display(tag).split(" ", 1)[1]
+        if tag in selected_tags:
+            badge_parts.append(f"**{icon} {name}** ({cat_counts[tag]})")
+        else:
+            badge_parts.append(f"~~{icon} {name}~~ ({cat_counts[tag]})")
+    return " • ".join(badge_parts)
+
+
 def _display_summary_with_inline_media(
     summary_text: str, media_items: list[dict], chapter: dict
 ):
@@ -275,10 +559,16 @@ def _display_summary_with_inline_media(
     correct positions based on their page numbers relative to the chapter.
     Media is shown as smaller thumbnails with a click-to-enlarge popover.
     """
-    # Split summary into sections by ## headings
-    sections = re.split(r'(?=^## )', summary_text, flags=re.MULTILINE)
-    sections = [s for s in sections if s.strip()]
-    n_sections = len(sections)
+    # Section boundaries: text start plus every ## heading. Keep only the
+    # (start, end) spans — substrings are sliced out at render time.
+    bounds = [0]
+    bounds.extend(m.start() for m in _SECTION_HEADING_RE.finditer(summary_text))
+    bounds.append(len(summary_text))
+    section_spans = [
+        (start, end) for start, end in pairwise(bounds)
+        if _NON_BLANK_RE.search(summary_text, start, end)
+    ]
+    n_sections = len(section_spans)
 
     if n_sections == 0:
         st.markdown(summary_text)
@@ -289,41 +579,332 @@ def _display_summary_with_inline_media(
     ch_end = chapter["end_page"]
     ch_span = max(ch_end - ch_start, 1)
 
-    # Map each media item to a section index
-    media_by_section: dict[int, list[dict]] = {}
+    # Bucket each media item into its section in one pass
+    media_by_section: list[list[dict]] = [[] for _ in range(n_sections)]
     for media in media_items:
         page_offset = media["page"] - ch_start
         # Proportional position → section index
         section_idx = min(int((page_offset / ch_span) * n_sections), n_sections - 1)
-        section_idx = max(0, section_idx)
-        media_by_section.setdefault(section_idx, []).append(media)
+        media_by_section[max(0, section_idx)].append(media)
 
     # Render each section followed by its media
-    for s_idx, section_md in enumerate(sections):
-        st.markdown(section_md)
-
-        if s_idx in media_by_section:
-            for m_idx, media in enumerate(media_by_section[s_idx]):
-                icon = "📊" if media["type"] == "table" else "🖼️"
-                label = media.get("label", "Figure")
-
-                # Compact card: small image + description
-                st.markdown(
-                    f'<div class="media-container">'
-                    f'<div class="media-label">{icon} {label}</div>'
-                    f'</div>',
-                    unsafe_allow_html=True,
-                )
-                # Small thumbnail — columns for sizing
-                col_img, col_desc = st.columns([1, 2])
-                with col_img:
-                    st.image(media["bytes"], width=280)
+    for s_idx, (start, end) in enumerate(section_spans):
+        st.markdown(summary_text[start:end])
+
+        for media in media_by_section[s_idx]:
+            icon = "📊" if media["type"] == "table" else "🖼️"
+            label = media.get("label", "Figure")
+
+            # Compact card: small image + description
+            st.markdown(
+                f'<div class="media-container">'
+                f'<div class="media-label">{icon} {label}</div>'
+                f'</div>',
+                unsafe_allow_html=True,
+            )
+            # Small thumbnail — columns for sizing
+            col_img, col_desc = st.columns([1, 2])
+            with col_img:
+                image_bytes = _load_media_bytes(media)
+                if image_bytes:
+                    st.image(image_bytes, width=280)
                     # Click to enlarge via popover
                     with st.popover("🔍 Enlarge"):
-                        st.image(media["bytes"], use_container_width=True)
+                        st.image(image_bytes, use_container_width=True)
                         st.caption(label)
-                with col_desc:
-                    st.markdown(media.get("description", ""), unsafe_allow_html=False)
+                else:
+                    st.caption("_Image no longer available — re-run the analysis._")
+            with col_desc:
+                st.markdown(media.get("description", ""), unsafe_allow_html=False)
+
+
+# ── Helper: Lazy expander bodies ─────────────────────────────────────────────
+# Expander contents are always sent to the browser, so bodies sit behind a
+# toggle; as fragments, flipping one reruns only that body.
+
+@st.fragment
+def _cached_summary_preview(ch_idx: int, depth_val: str):
+    """Preview toggle for one entry of the cached summaries browser."""
+    if st.toggle("Preview", key=f"preview_cached_{ch_idx}_{depth_val}"):
+        preview = load_cached_summary(st.session_state.pdf_filename, ch_idx, depth_val) or ""
+        st.markdown(preview[:2000] + ("\n\n*... (preview truncated)*" if len(preview) > 2000 else ""))
+
+
+@st.fragment
+def _man_summary_preview(cmd_name: str):
+    """Show toggle for one summarized man page."""
+    if st.toggle("Show summary", key=f"preview_man_{cmd_name}"):
+        st.markdown(st.session_state.man_summaries[cmd_name]["summary"])
+
+
+@st.fragment
+def _raw_text_preview():
+    """Raw chapter text toggle for the Summary tab."""
+    if st.toggle("📄 View Raw Chapter Text", key="show_raw_text"):
+        text = st.session_state.chapter_text
+        st.text(text[:5000] + ("\n\n... (truncated)" if len(text) > 5000 else ""))
+
+
+@st.fragment(run_every=0.5)
+def _poll_man_page_lookups():
+    """Collect finished background lookups; rerun the app once none are pending."""
+    futures = st.session_state.man_futures
+    for cmd, future in list(futures.items()):
+        if not future.done():
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"status": "error", "summary": f"Lookup failed: {e}"}
+        # Gemini errors come back as text, so only persist real summaries
+        if result["status"] == "success" and not result["summary"].startswith("❌"):
+            save_man_summary(cmd, result)
+        st.session_state.man_summaries[cmd] = result
+        del futures[cmd]
+
+    if futures:
+        st.caption("⏳ Looking up " + ", ".join(f"`{c}`" for c in futures) + "...")
+    else:
+        st.rerun()
+
+
+# ── Helper: PDF export ───────────────────────────────────────────────────────
+
+_SAFE_TITLE_RE = re.compile(r'[^\w\s-]')
+
+
+@lru_cache(maxsize=256)
+def _safe_export_title(title: str) -> str:
+    """Chapter title made safe for the export filename (sanitized once per title)."""
+    return _SAFE_TITLE_RE.sub('', title).strip().replace(' ', '_')
+
+
+def _media_fingerprint(media_items: list[dict]) -> tuple:
+    """Small hashable stand-in for media items (content hash + rendered fields)."""
+    return tuple(
+        (
+            m["bytes_sha"],
+            m.get("description", ""),
+            m.get("page", 0),
+            m.get("label", ""),
+            m.get("type", ""),
+        )
+        for m in media_items
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner="Rendering PDF...")
+def _render_summary_pdf(
+    chapter_title: str,
+    chapter_info: str,
+    summary_text: str,
+    depth_label: str,
+    book_title: str,
+    media_fingerprint: tuple,
+    chapter_start_page: int,
+    chapter_end_page: int,
+    _media_items: list[dict],
+) -> bytes:
+    """Export a summary PDF once per unique content; media is keyed by fingerprint."""
+    return SummaryPDFExporter().export(
+        chapter_title=chapter_title,
+        chapter_info=chapter_info,
+        summary_text=summary_text,
+        depth_label=depth_label,
+        book_title=book_title,
+        media_items=[{**m, "bytes": _load_media_bytes(m)} for m in _media_items],
+        chapter_start_page=chapter_start_page,
+        chapter_end_page=chapter_end_page,
+    )
+
+
+# ── Helper: Chapter table ────────────────────────────────────────────────────
+
+def _select_chapter(i: int):
+    """Make chapter i current: load its text and any cached summary, then rerun."""
+    # Already selected and loaded — keep the current text and summary
+    if st.session_state.current_chapter_idx == i and st.session_state.chapter_text:
+        st.rerun()
+
+    chapter = st.session_state.chapters[i]
+    st.session_state.current_chapter_idx = i
+    st.session_state.chapter_media = []
+
+    # Load or extract chapter text
+    cached = load_cached_text(st.session_state.pdf_filename, i)
+    if cached:
+        st.session_state.chapter_text = cached
+    else:
+        text = st.session_state.parser.extract_text(
+            chapter["start_page"], chapter["end_page"]
+        )
+        st.session_state.chapter_text = text
+        cache_chapter_text(st.session_state.pdf_filename, i, text)
+
+    # Auto-load cached summary (try standard first, then any depth)
+    loaded_summary = None
+    loaded_depth = ""
+    found = _find_any_cached_summary(st.session_state.pdf_filename, i)
+    if found:
+        loaded_summary = found[1]
+        loaded_depth = AUTOLOAD_DEPTHS[found[0]]
+
+    st.session_state.current_summary = loaded_summary or ""
+    st.session_state.current_summary_depth = loaded_depth
+    st.session_state.summary_from_cache = bool(loaded_summary)
+    st.rerun()
+
+
+@st.fragment(run_every=1)
+def _chapter_autosave():
+    """Persist table edits after 2 s without further edits — one write per burst of toggles."""
+    if st.session_state.get("chapters_dirty"):
+        if time.monotonic() - st.session_state.chapters_edited_at >= 2:
+            _flush_chapters()
+        else:
+            st.caption("✏️ Saving changes...")
+
+
+def _verified_count(chapters: list[dict]) -> int:
+    """
+    Number of verified chapters — counted once per chapter list, then kept
+    current by _adjust_verified_count. Any other change to the list (new
+    book, auto-detect, manual add) changes its identity or length and
+    triggers a recount.
+    """
+    cached = st.session_state.get("verified_count")
+    if cached is None or cached[:2] != (id(chapters), len(chapters)):
+        cached = (id(chapters), len(chapters), sum(1 for c in chapters if c.get("verified")))
+        st.session_state.verified_count = cached
+    return cached[2]
+
+
+def _adjust_verified_count(delta: int):
+    """Apply a verification toggle to the cached count."""
+    cached = st.session_state.get("verified_count")
+    if cached is not None:
+        st.session_state.verified_count = (cached[0], cached[1], cached[2] + delta)
+
+
+@st.fragment
+def _chapter_table(show_level: str):
+    """
+    Render the chapter list as one editable table plus a chapter picker.
+    Verified and page-range edits are saved in a single write. Runs as a
+    fragment so picking a chapter or editing rows only re-executes this block.
+    """
+    chapters = st.session_state.chapters
+
+    # Lives in the fragment so it stays current on fragment-only reruns
+    verified_count = _verified_count(chapters)
+    st.markdown(
+        f"**{len(chapters)} chapters detected** — "
+        f"✅ {verified_count} verified, "
+        f"⚠️ {len(chapters) - verified_count} unverified"
+    )
+
+    # Level filter resolved once, not re-compared per row
+    wanted_level = {"Level 1 (Chapters)": 1, "Level 2 (Sections)": 2}.get(show_level)
+
+    rows = []
+    for i, chapter in enumerate(chapters):
+        if wanted_level is not None and chapter["level"] != wanted_level:
+            continue
+        rows.append({
+            "idx": i,
+            "Verified": bool(chapter.get("verified", False)),
+            "Title": "  " * (chapter["level"] - 1) + chapter["title"],
+            "Start": chapter["start_page"] + 1,
+            "End": chapter["end_page"] + 1,
+        })
+
+    if not rows:
+        st.caption("_No chapters at this level._")
+        return
+
+    total_pages = st.session_state.parser.total_pages
+    edited_rows = st.data_editor(
+        rows,
+        key=f"chapter_table_{st.session_state.chapter_table_version}",
+        hide_index=True,
+        num_rows="fixed",
+        use_container_width=True,
+        disabled=["Title"],
+        column_config={
+            "idx": None,  # hidden — maps rows back to st.session_state.chapters
+            "Verified": st.column_config.CheckboxColumn("✅", help="Verified chapter", width="small"),
+            "Title": st.column_config.TextColumn("Chapter", width="large"),
+            "Start": st.column_config.NumberColumn(
+                "Start page", min_value=1, max_value=total_pages, step=1, required=True
+            ),
+            "End": st.column_config.NumberColumn(
+                "End page", min_value=1, max_value=total_pages, step=1, required=True
+            ),
+        },
+    )
+
+    # Apply all edits in one pass, then persist once
+    changed = False
+    current_pages_changed = False
+    invalid_titles = []
+    for row in edited_rows:
+        chapter = chapters[row["idx"]]
+        # Cleared or inverted page ranges are never saved
+        if row["Start"] is None or row["End"] is None or row["Start"] > row["End"]:
+            invalid_titles.append(chapter["title"])
+            continue
+        verified = bool(row["Verified"])
+        start_page = int(row["Start"]) - 1
+        end_page = int(row["End"]) - 1
+        if (verified, start_page, end_page) != (
+            bool(chapter.get("verified", False)), chapter["start_page"], chapter["end_page"]
+        ):
+            if verified != bool(chapter.get("verified", False)):
+                _adjust_verified_count(1 if verified else -1)
+            if row["idx"] == st.session_state.current_chapter_idx and (
+                (start_page, end_page) != (chapter["start_page"], chapter["end_page"])
+            ):
+                current_pages_changed = True
+            chapter["verified"] = verified
+            chapter["start_page"] = start_page
+            chapter["end_page"] = end_page
+            changed = True
+
+    if invalid_titles:
+        st.warning(
+            "⚠️ Not saved — start page must be set and no later than the end page: "
+            + ", ".join(f"**{title}**" for title in invalid_titles)
+        )
+
+    if changed:
+        # Saved by _chapter_autosave once edits pause, not on every toggle
+        st.session_state.chapters_dirty = True
+        st.session_state.chapters_edited_at = time.monotonic()
+        st.session_state.chapter_table_version += 1  # fresh editor state
+        # Only the selected chapter's page range is shown outside this table
+        st.rerun(scope="app" if current_pages_changed else "fragment")
+
+    if st.session_state.get("chapters_dirty"):
+        _chapter_autosave()
+
+    # Chapter picker
+    visible = [row["idx"] for row in rows]
+    current = st.session_state.current_chapter_idx
+    col_pick, col_select = st.columns([4, 1])
+    with col_pick:
+        picked = st.selectbox(
+            "Chapter to study",
+            visible,
+            index=visible.index(current) if current in visible else 0,
+            format_func=lambda i: (
+                f"{chapters[i]['title']} "
+                f"(pp. {chapters[i]['start_page'] + 1}–{chapters[i]['end_page'] + 1})"
+            ),
+            label_visibility="collapsed",
+        )
+    with col_select:
+        if st.button("📖 Select", type="primary", use_container_width=True, help="Select for summary/Q&A"):
+            _select_chapter(picked)
 
 
 # ── Main Content Area ────────────────────────────────────────────────────────
@@ -333,17 +914,19 @@ if not st.session_state.parser:
     st.markdown("# 📚 StudySage")
     st.markdown("**Your AI-powered study companion for PDF textbooks.**")
 
-    library_books = get_library_books()
+    library_books = _cached_library_books()
 
     if library_books:
         st.divider()
         st.subheader("📖 Your Library")
         st.caption("Click a book to pick up where you left off")
 
-        # Display books in a grid (3 per row)
+        # Display books in a grid (3 per row) — most recently opened first,
+        # only the first page of covers is loaded until the user asks for more
         cols_per_row = 3
-        for row_start in range(0, len(library_books), cols_per_row):
-            row_books = library_books[row_start:row_start + cols_per_row]
+        visible_books = library_books[:st.session_state.library_page_size]
+        for row_start in range(0, len(visible_books), cols_per_row):
+            row_books = visible_books[row_start:row_start + cols_per_row]
             cols = st.columns(cols_per_row)
 
             for col_idx, book in enumerate(row_books):
@@ -361,24 +944,21 @@ if not st.session_state.parser:
                         )
 
                     # Book info
-                    display_title = book.get("title", book["filename"])
-                    if len(display_title) > 40:
-                        display_title = display_title[:37] + "..."
-                    st.markdown(f"**{display_title}**")
+                    display_title = html.escape(book.get("title", book["filename"]))
+                    st.markdown(
+                        f'<div class="book-title" title="{display_title}">{display_title}</div>',
+                        unsafe_allow_html=True,
+                    )
 
                     author = book.get("author", "Unknown")
                     pages = book.get("total_pages", "?")
                     n_ch = book.get("num_chapters", 0)
                     st.caption(f"{author} • {pages} pages • {n_ch} chapters")
 
-                    # Last opened timestamp
-                    last_opened = book.get("last_opened", "")
+                    # Last opened timestamp (pre-formatted when it was written)
+                    last_opened = book.get("last_opened_display", "")
                     if last_opened:
-                        try:
-                            dt = datetime.fromisoformat(last_opened)
-                            st.caption(f"Last opened: {dt.strftime('%b %d, %Y %I:%M %p')}")
-                        except Exception:
-                            pass
+                        st.caption(f"Last opened: {last_opened}")
 
                     # Open button
                     if st.button(
@@ -390,6 +970,7 @@ if not st.session_state.parser:
                         pdf_path = book["pdf_path"]
                         _open_book(pdf_path, book["filename"])
                         update_library_last_opened(book["filename"])
+                        _cached_library_books.clear()
                         st.rerun()
 
                     # Delete button (small)
@@ -399,8 +980,16 @@ if not st.session_state.parser:
                         help="Remove from library",
                     ):
                         remove_book_from_library(book["filename"])
+                        _invalidate_summary_caches()
+                        _cached_library_books.clear()
                         st.rerun()
 
+        remaining = len(library_books) - len(visible_books)
+        if remaining > 0:
+            if st.button(f"⬇️ Load more ({remaining} more)", use_container_width=True):
+                st.session_state.library_page_size += LIBRARY_PAGE_SIZE
+                st.rerun()
+
         st.divider()
 
     # Getting started section
@@ -444,9 +1033,19 @@ with tab_chapters:
     if not chapters:
         st.warning(
             "No chapters detected automatically. This PDF might not have a table of contents embedded. "
-            "You can add chapters manually below."
+            "Scan the PDF for chapter headings, or add chapters manually below."
         )
 
+        if st.button("🔍 Auto-detect chapters (scan full PDF)", type="primary"):
+            with st.spinner(f"Scanning {st.session_state.parser.total_pages} pages for chapter headings..."):
+                detected = st.session_state.parser.fallback_chapter_detection()
+            if detected:
+                st.session_state.chapters = detected
+                save_chapters(st.session_state.pdf_filename, detected)
+                st.rerun()
+            else:
+                st.info("No chapter headings found — add chapters manually below.")
+
         # Manual chapter addition
         with st.expander("➕ Add Chapter Manually"):
             col1, col2, col3 = st.columns([3, 1, 1])
@@ -475,18 +1074,16 @@ with tab_chapters:
                 st.rerun()
     else:
         # Chapter verification controls
-        st.markdown(
-            f"**{len(chapters)} chapters detected** — "
-            f"✅ {sum(1 for c in chapters if c.get('verified'))} verified, "
-            f"⚠️ {sum(1 for c in chapters if not c.get('verified'))} unverified"
-        )
-
         col_verify_all, col_filter = st.columns([1, 2])
         with col_verify_all:
             if st.button("✅ Verify All Chapters"):
                 for i in range(len(st.session_state.chapters)):
                     st.session_state.chapters[i]["verified"] = True
                 save_chapters(st.session_state.pdf_filename, st.session_state.chapters)
+                st.session_state.chapters_dirty = False  # pending table edits included
+                chapters = st.session_state.chapters
+                st.session_state.verified_count = (id(chapters), len(chapters), len(chapters))
+                st.session_state.chapter_table_version += 1
                 st.rerun()
 
         with col_filter:
@@ -499,94 +1096,7 @@ with tab_chapters:
         st.divider()
 
         # Display chapters
-        for i, chapter in enumerate(chapters):
-            # Apply level filter
-            if show_level == "Level 1 (Chapters)" and chapter["level"] != 1:
-                continue
-            if show_level == "Level 2 (Sections)" and chapter["level"] != 2:
-                continue
-
-            verified = chapter.get("verified", False)
-            indent = "  " * (chapter["level"] - 1)
-            icon = "✅" if verified else "⚠️"
-            pages = f"pp. {chapter['start_page'] + 1}–{chapter['end_page'] + 1}"
-
-            with st.container():
-                col_info, col_pages, col_actions = st.columns([4, 2, 2])
-
-                with col_info:
-                    st.markdown(f"{indent}{icon} **{chapter['title']}**")
-
-                with col_pages:
-                    st.caption(pages)
-
-                with col_actions:
-                    btn_col1, btn_col2, btn_col3 = st.columns(3)
-                    with btn_col1:
-                        if st.button("✓", key=f"verify_{i}", help="Verify this chapter"):
-                            st.session_state.chapters[i]["verified"] = not verified
-                            save_chapters(st.session_state.pdf_filename, st.session_state.chapters)
-                            st.rerun()
-                    with btn_col2:
-                        if st.button("📖", key=f"select_{i}", help="Select for summary/Q&A"):
-                            st.session_state.current_chapter_idx = i
-                            st.session_state.chapter_media = []
-
-                            # Load or extract chapter text
-                            cached = load_cached_text(st.session_state.pdf_filename, i)
-                            if cached:
-                                st.session_state.chapter_text = cached
-                            else:
-                                text = st.session_state.parser.extract_text(
-                                    chapter["start_page"], chapter["end_page"]
-                                )
-                                st.session_state.chapter_text = text
-                                cache_chapter_text(st.session_state.pdf_filename, i, text)
-
-                            # Auto-load cached summary (try standard first, then any depth)
-                            loaded_summary = None
-                            loaded_depth = ""
-                            for try_depth, try_label in [
-                                ("standard", "🔵 Standard"),
-                                ("detailed", "🟠 Detailed"),
-                                ("comprehensive", "🔴 Comprehensive"),
-                                ("brief", "🟢 Brief"),
-                            ]:
-                                cached_sum = load_cached_summary(st.session_state.pdf_filename, i, try_depth)
-                                if cached_sum:
-                                    loaded_summary = cached_sum
-                                    loaded_depth = try_label
-                                    break
-
-                            st.session_state.current_summary = loaded_summary or ""
-                            st.session_state.current_summary_depth = loaded_depth
-                            st.session_state.summary_from_cache = bool(loaded_summary)
-                            st.rerun()
-                    with btn_col3:
-                        if st.button("✏️", key=f"edit_{i}", help="Edit page range"):
-                            st.session_state[f"editing_{i}"] = True
-
-                # Edit page range (expandable)
-                if st.session_state.get(f"editing_{i}", False):
-                    with st.expander("Edit Page Range", expanded=True):
-                        ec1, ec2, ec3 = st.columns([1, 1, 1])
-                        with ec1:
-                            new_start = st.number_input(
-                                "Start", value=chapter["start_page"] + 1, min_value=1, key=f"start_{i}"
-                            )
-                        with ec2:
-                            new_end = st.number_input(
-                                "End", value=chapter["end_page"] + 1, min_value=1, key=f"end_{i}"
-                            )
-                        with ec3:
-                            if st.button("Save", key=f"save_edit_{i}"):
-                                update_chapter_pages(
-                                    st.session_state.pdf_filename, i, new_start - 1, new_end - 1
-                                )
-                                st.session_state.chapters[i]["start_page"] = new_start - 1
-                                st.session_state.chapters[i]["end_page"] = new_end - 1
-                                st.session_state[f"editing_{i}"] = False
-                                st.rerun()
+        _chapter_table(show_level)
 
     # Show selected chapter info
     if st.session_state.current_chapter_idx is not None:
@@ -684,21 +1194,32 @@ with tab_summary:
         if not st.session_state.summarizer:
             st.error("❌ Please enter your Gemini API key in the sidebar first")
         else:
-            # Use cache unless force-regenerating or custom instructions present
-            if cached_exists and not custom_instructions and not force_regenerate:
-                st.session_state.current_summary = cached_exists
+            # Same text + depth + instructions + model → same summary, even with
+            # custom instructions or after the book was renamed
+            content_key = get_summary_content_key(
+                text, selected_depth.value, custom_instructions,
+                st.session_state.summarizer.model_name,
+            )
+
+            # Use cache unless force-regenerating
+            cached_summary = None
+            if not force_regenerate:
+                cached_summary = cached_exists or load_summary_by_content(content_key)
+
+            if cached_summary:
+                st.session_state.current_summary = cached_summary
                 st.session_state.current_summary_depth = selected_depth_name
                 st.session_state.summary_from_cache = True
             else:
                 with st.spinner(f"Generating {selected_depth.value} summary with Gemini..."):
                     # Detect sub-sections within the chapter
                     parser = st.session_state.parser
-                    sections = parser.extract_sections(
-                        chapter["start_page"], chapter["end_page"]
+                    sections = _cached_sections(
+                        _pdf_cache_key(parser), chapter["start_page"], chapter["end_page"], parser
                     )
 
                     if len(sections) > 1:
-                        st.caption(f"📑 Detected **{len(sections)} sections** — summarizing each individually...")
+                        st.caption(f"📑 Detected **{len(sections)} sections** — summarizing them in parallel...")
 
                         # Show section names
                         with st.expander("Detected sections"):
@@ -708,10 +1229,10 @@ with tab_summary:
                         # Progress bar
                         progress_bar = st.progress(0, text="Starting...")
 
-                        def update_progress(current, total, section_title):
-                            pct = current / (total + 1)  # +1 for the combine step
-                            if current < total:
-                                progress_bar.progress(pct, text=f"Summarizing: {section_title} ({current+1}/{total})")
+                        def update_progress(completed, total, section_title):
+                            pct = completed / (total + 1)  # +1 for the combine step
+                            if completed < total:
+                                progress_bar.progress(pct, text=f"Summarized: {section_title} ({completed}/{total})")
                             else:
                                 progress_bar.progress(pct, text="Combining sections into final summary...")
 
@@ -723,17 +1244,32 @@ with tab_summary:
                             progress_callback=update_progress,
                         )
                         progress_bar.progress(1.0, text="✅ Done!")
+                        stream_failed = False
                     else:
-                        # Single section or short chapter — summarize directly
-                        summary = st.session_state.summarizer.summarize(
-                            text, chapter["title"], selected_depth, custom_instructions
+                        # Single section or short chapter — stream it in as it's written;
+                        # the placeholder is cleared once the full summary renders below
+                        stream_placeholder = st.empty()
+                        summary_stream = st.session_state.summarizer.summarize(
+                            text, chapter["title"], selected_depth, custom_instructions,
+                            stream=True,
                         )
-
-                    # Cache it (only if no custom instructions)
-                    if not custom_instructions:
-                        cache_summary(
-                            st.session_state.pdf_filename, idx, selected_depth.value, summary
+                        with stream_placeholder.container():
+                            summary = st.write_stream(summary_stream)
+                        stream_placeholder.empty()
+                        stream_failed = summary_stream.interrupted
+
+                    # Cache it by content; the per-book cache only holds
+                    # summaries without custom instructions. Errors and
+                    # truncated streams are never cached.
+                    if summary and not summary.startswith("❌") and not stream_failed:
+                        cache_summary_by_content(
+                            content_key, summary, st.session_state.pdf_filename
                         )
+                        if not custom_instructions:
+                            cache_summary(
+                                st.session_state.pdf_filename, idx, selected_depth.value, summary
+                            )
+                            _invalidate_summary_caches()
 
                     st.session_state.current_summary = summary
                     st.session_state.current_summary_depth = selected_depth_name
@@ -755,27 +1291,46 @@ with tab_summary:
                     st.caption(f"Found **{len(images)} images** and **{len(tables)} tables** — analyzing with Gemini Vision...")
                     media_progress = st.progress(0, text="Analyzing visuals...")
 
-                    for m_idx, media in enumerate(all_media):
-                        pct = (m_idx + 1) / len(all_media)
-                        media_progress.progress(pct, text=f"Analyzing {media['label']} ({m_idx+1}/{len(all_media)})...")
-
-                        if media["type"] == "image":
-                            description = summarizer.describe_image(
-                                media["bytes"], chapter["title"], media["mime_type"]
-                            )
-                        else:
-                            description = summarizer.describe_table(
-                                media["bytes"], media.get("text", ""),
-                                chapter["title"], media["mime_type"]
-                            )
+                    def update_media_progress(done, total):
+                        media_progress.progress(
+                            done / total, text=f"Analyzed {done} of {total} visuals..."
+                        )
 
-                        st.session_state.chapter_media.append({
+                    # Keep bytes on disk, not in session state; the content hash
+                    # also keys the description cache
+                    stored = [cache_media_bytes(media["bytes"]) for media in all_media]
+                    descriptions = load_media_descriptions([digest for digest, _ in stored])
+
+                    # Only unseen visuals go to Gemini — one request per distinct image
+                    to_describe: dict[str, dict] = {}
+                    for media, (digest, _) in zip(all_media, stored):
+                        if digest not in descriptions:
+                            to_describe.setdefault(digest, media)
+
+                    if to_describe:
+                        if len(to_describe) < len(all_media):
+                            st.caption(f"Reusing {len(all_media) - len(to_describe)} previously analyzed visuals.")
+                        # Batched Vision requests, several batches in flight at once
+                        new_descriptions = summarizer.describe_media_batches(
+                            list(to_describe.values()), chapter["title"],
+                            progress_callback=update_media_progress,
+                        )
+                        for digest, description in zip(to_describe, new_descriptions):
+                            descriptions[digest] = description
+                            if description and not description.startswith("❌"):
+                                cache_media_description(digest, description)
+
+                    chapter_media = []
+                    for media, (digest, path) in zip(all_media, stored):
+                        chapter_media.append({
                             "type": media["type"],
-                            "bytes": media["bytes"],
-                            "description": description,
+                            "bytes_sha": digest,
+                            "path": path,
+                            "description": descriptions[digest],
                             "page": media["page"],
                             "label": media["label"],
                         })
+                    st.session_state.chapter_media = chapter_media
 
                     media_progress.progress(1.0, text="✅ All visuals analyzed!")
                 else:
@@ -815,26 +1370,15 @@ with tab_summary:
             )
             selected_tags = [filter_options[lbl] for lbl in selected_labels]
 
-            # Count sections per category
-            cat_counts = {}
-            for s in parsed_sections:
-                cat_counts[s.category_tag] = cat_counts.get(s.category_tag, 0) + 1
-
             # Show category badge counts
-            badge_parts = []
-            for tag in active_cats:
-                icon = get_category_icon(tag)
-                count = cat_counts.get(tag, 0)
-                name = get_category_display(tag).split(" ", 1)[1]
-                if tag in selected_tags:
-                    badge_parts.append(f"**{icon} {name}** ({count})")
-                else:
-                    badge_parts.append(f"~~{icon} {name}~~ ({count})")
-            st.caption(" • ".join(badge_parts))
+            st.caption(_category_badges(summary_text, tuple(sorted(selected_tags))))
 
-            # Filter sections
-            filtered = filter_sections(parsed_sections, selected_tags)
-            filtered_text = rebuild_summary_text(filtered)
+            # Every (or no) category selected shows the whole summary — skip the rebuild
+            if not selected_tags or len(selected_tags) == len(active_cats):
+                filtered_text = summary_text
+            else:
+                # Filter sections (sorted tags give a stable cache key)
+                filtered_text = _filtered_summary_text(summary_text, tuple(sorted(selected_tags)))
         else:
             filtered_text = summary_text
 
@@ -848,26 +1392,22 @@ with tab_summary:
         st.divider()
         col_export, col_spacer = st.columns([1, 2])
         with col_export:
-            exporter = SummaryPDFExporter()
-            book_title = ""
-            if st.session_state.parser:
-                meta = st.session_state.parser.get_metadata()
-                book_title = meta.get("title", "")
-            pdf_bytes = exporter.export(
+            book_title = st.session_state.book_meta.get("title", "")
+            pdf_bytes = _render_summary_pdf(
                 chapter_title=chapter["title"],
                 chapter_info=f"Pages {chapter['start_page']+1}-{chapter['end_page']+1}",
                 summary_text=st.session_state.current_summary,
                 depth_label=st.session_state.get("current_summary_depth", ""),
                 book_title=book_title,
-                media_items=media_items,
+                media_fingerprint=_media_fingerprint(media_items),
                 chapter_start_page=chapter["start_page"],
                 chapter_end_page=chapter["end_page"],
+                _media_items=media_items,
             )
-            safe_title = re.sub(r'[^\w\s-]', '', chapter["title"]).strip().replace(' ', '_')
             st.download_button(
                 "📥 Export Summary to PDF",
                 data=pdf_bytes,
-                file_name=f"StudySage_{safe_title}_summary.pdf",
+                file_name=f"StudySage_{_safe_export_title(chapter['title'])}_summary.pdf",
                 mime="application/pdf",
                 use_container_width=True,
             )
@@ -877,7 +1417,10 @@ with tab_summary:
     st.subheader("📚 All Cached Summaries")
     st.caption("Previously generated summaries for all chapters — click to view without regenerating.")
 
+    # One directory scan for the whole book; bodies are read only on demand
+    summary_index = _cached_summary_index(st.session_state.pdf_filename)
     cached_found = []
+    cached_chapters: set[int] = set()
     for ch_i, ch in enumerate(st.session_state.chapters):
         for depth_val, depth_label in [
             ("brief", "🟢 Brief"),
@@ -885,24 +1428,24 @@ with tab_summary:
             ("detailed", "🟠 Detailed"),
             ("comprehensive", "🔴 Comprehensive"),
         ]:
-            cached_sum = load_cached_summary(st.session_state.pdf_filename, ch_i, depth_val)
-            if cached_sum:
+            entry = summary_index.get((ch_i, depth_val))
+            if entry and entry["size"]:
                 cached_found.append({
                     "ch_idx": ch_i,
                     "title": ch["title"],
                     "depth": depth_label,
                     "depth_val": depth_val,
-                    "summary": cached_sum,
-                    "length": len(cached_sum),
+                    "size": entry["size"],
                 })
+                cached_chapters.add(ch_i)
 
     if cached_found:
-        st.markdown(f"**{len(cached_found)}** cached summaries across **{len(set(c['ch_idx'] for c in cached_found))}** chapters")
+        st.markdown(f"**{len(cached_found)}** cached summaries across **{len(cached_chapters)}** chapters")
         for item in cached_found:
             is_current = (item["ch_idx"] == idx and item["depth"] == st.session_state.get("current_summary_depth", ""))
             icon = "📖" if is_current else "📄"
             with st.expander(
-                f"{icon} {item['title']} — {item['depth']} ({item['length']:,} chars)",
+                f"{icon} {item['title']} — {item['depth']} ({item['size'] / 1024:,.1f} KB)",
                 expanded=False,
             ):
                 if st.button(
@@ -912,7 +1455,9 @@ with tab_summary:
                 ):
                     # Switch to this chapter + summary
                     st.session_state.current_chapter_idx = item["ch_idx"]
-                    st.session_state.current_summary = item["summary"]
+                    st.session_state.current_summary = load_cached_summary(
+                        st.session_state.pdf_filename, item["ch_idx"], item["depth_val"]
+                    ) or ""
                     st.session_state.current_summary_depth = item["depth"]
                     st.session_state.summary_from_cache = True
                     # Load chapter text too
@@ -920,37 +1465,50 @@ with tab_summary:
                     if ch_text:
                         st.session_state.chapter_text = ch_text
                     st.rerun()
-                st.markdown(item["summary"][:2000] + ("\n\n*... (preview truncated)*" if len(item["summary"]) > 2000 else ""))
+                _cached_summary_preview(item["ch_idx"], item["depth_val"])
     else:
         st.caption("_No cached summaries yet. Generate a summary above and it will appear here._")
 
-    # Show raw text option
-    with st.expander("📄 View Raw Chapter Text"):
-        st.text(text[:5000] + ("\n\n... (truncated)" if len(text) > 5000 else ""))
+    # Show raw text option — the 5k slice is built only while the toggle is on
+    _raw_text_preview()
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TAB 3: Q&A
 # ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_qa:
-    st.header("❓ Ask Questions About This Chapter")
+QA_ROLE_LABELS = {"user": "🧑 **You**", "assistant": "🤖 **StudySage**"}
 
-    if st.session_state.current_chapter_idx is None:
-        st.info("👈 Select a chapter from the **Chapters** tab first (click the 📖 button)")
-        st.stop()
 
-    idx = st.session_state.current_chapter_idx
-    chapter = st.session_state.chapters[idx]
-    text = st.session_state.chapter_text
+def _qa_history_markdown(n_messages: int) -> str:
+    """Markdown for the first n_messages of the chat, extended incrementally."""
+    history = st.session_state.qa_history
+    rendered = st.session_state.get("qa_history_md", "")
+    count = st.session_state.get("qa_history_md_count", 0)
+    if count > n_messages:  # chat was cleared or shortened — rebuild
+        rendered, count = "", 0
+    for msg in history[count:n_messages]:
+        label = QA_ROLE_LABELS.get(msg["role"], msg["role"])
+        rendered += f"{label}\n\n{msg['content']}\n\n---\n\n"
+    st.session_state.qa_history_md = rendered
+    st.session_state.qa_history_md_count = n_messages
+    return rendered
 
-    st.markdown(f"**Asking about:** {chapter['title']}")
 
+@st.fragment
+def _qa_panel(chapter: dict, text: str):
+    """Chat pane — a fragment, so asking a question reruns only this tab's chat."""
     # Initialize chat history in session state
     if "qa_history" not in st.session_state:
         st.session_state.qa_history = []
 
-    # Display chat history
-    for msg in st.session_state.qa_history:
+    # Display chat history — older turns as one prebuilt markdown block, only
+    # the latest exchange as chat bubbles, so widget count stays constant
+    history = st.session_state.qa_history
+    n_old = max(0, len(history) - 2)
+    older = _qa_history_markdown(n_old)
+    if older:
+        st.markdown(older)
+    for msg in history[n_old:]:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
 
@@ -966,15 +1524,16 @@ with tab_qa:
             with st.chat_message("user"):
                 st.markdown(question)
 
-            # Generate answer
+            # Generate answer — streamed so it shows up as it's written
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
                     # Truncate text if too long for a single query
-                    query_text = text[:30000] if len(text) > 30000 else text
-                    answer = st.session_state.summarizer.ask_question(
-                        query_text, question, chapter["title"]
+                    query_text = _query_text(st.session_state.summarizer, text)
+                answer = st.write_stream(
+                    st.session_state.summarizer.ask_question(
+                        query_text, question, chapter["title"], stream=True
                     )
-                    st.markdown(answer)
+                )
 
             st.session_state.qa_history.append({"role": "assistant", "content": answer})
 
@@ -992,20 +1551,17 @@ with tab_qa:
         with quick_cols[i]:
             if st.button(qq, key=f"quick_{i}", use_container_width=True):
                 st.session_state.qa_history.append({"role": "user", "content": qq})
-                st.rerun()
+                st.rerun(scope="fragment")
 
     # Clear chat
     if st.session_state.qa_history:
         if st.button("🗑️ Clear Chat"):
             st.session_state.qa_history = []
-            st.rerun()
+            st.rerun(scope="fragment")
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# TAB 4: Extract
-# ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_extract:
-    st.header("🔍 Extract Key Information")
+with tab_qa:
+    st.header("❓ Ask Questions About This Chapter")
 
     if st.session_state.current_chapter_idx is None:
         st.info("👈 Select a chapter from the **Chapters** tab first (click the 📖 button)")
@@ -1015,8 +1571,25 @@ with tab_extract:
     chapter = st.session_state.chapters[idx]
     text = st.session_state.chapter_text
 
-    st.markdown(f"**Extracting from:** {chapter['title']}")
+    st.markdown(f"**Asking about:** {chapter['title']}")
+
+    _qa_panel(chapter, text)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TAB 4: Extract
+# ═══════════════════════════════════════════════════════════════════════════════
+
+EXTRACT_TYPE_LABELS = {
+    "commands": "🖥️ Commands & Flags",
+    "terms": "📖 Key Terms & Definitions",
+    "concepts": "💡 Concepts & Ideas",
+    "examples": "📋 Examples & Code Snippets",
+}
+
 
+@st.fragment
+def _extract_panel(idx: int, chapter: dict, text: str):
+    """Command / AI extraction and the tracking index, rerun as one fragment."""
     extract_col1, extract_col2 = st.columns(2)
 
     # ── Local regex-based command extraction ──
@@ -1025,12 +1598,13 @@ with tab_extract:
         st.caption("Uses pattern matching — instant, no API needed")
 
         if st.button("Extract Commands (Regex)", use_container_width=True):
-            extractor = CommandExtractor()
-            commands = extractor.extract_from_text(text)
+            commands, commands_table = _regex_commands(
+                st.session_state.pdf_filename, idx, (chapter["start_page"], chapter["end_page"]), text
+            )
 
             if commands:
                 st.success(f"Found **{len(commands)}** commands")
-                st.markdown(extractor.format_commands_table(commands))
+                st.markdown(commands_table)
 
                 # Auto-register in the command registry and persist
                 st.session_state.command_registry.register_commands(
@@ -1048,15 +1622,14 @@ with tab_extract:
         if st.button("Extract Commands (Font Analysis)", use_container_width=True):
             if st.session_state.parser:
                 with st.spinner("Analyzing fonts..."):
-                    blocks = st.session_state.parser.extract_text_blocks(
-                        chapter["start_page"], chapter["end_page"]
+                    parser = st.session_state.parser
+                    commands, commands_table = _font_commands(
+                        _pdf_cache_key(parser), chapter["start_page"], chapter["end_page"], parser
                     )
-                    extractor = CommandExtractor()
-                    commands = extractor.extract_from_blocks(blocks)
 
                     if commands:
                         st.success(f"Found **{len(commands)}** commands via font analysis")
-                        st.markdown(extractor.format_commands_table(commands))
+                        st.markdown(commands_table)
 
                         # Auto-register in the command registry and persist
                         st.session_state.command_registry.register_commands(
@@ -1077,13 +1650,8 @@ with tab_extract:
 
         extract_type = st.selectbox(
             "What to extract",
-            ["commands", "terms", "concepts", "examples"],
-            format_func=lambda x: {
-                "commands": "🖥️ Commands & Flags",
-                "terms": "📖 Key Terms & Definitions",
-                "concepts": "💡 Concepts & Ideas",
-                "examples": "📋 Examples & Code Snippets",
-            }[x],
+            list(EXTRACT_TYPE_LABELS),
+            format_func=EXTRACT_TYPE_LABELS.get,
         )
 
         if st.button("🤖 Extract with AI", type="primary", use_container_width=True):
@@ -1091,11 +1659,39 @@ with tab_extract:
                 st.error("❌ Please enter your Gemini API key in the sidebar")
             else:
                 with st.spinner(f"Extracting {extract_type} with Gemini..."):
-                    query_text = text[:30000] if len(text) > 30000 else text
-                    result = st.session_state.summarizer.extract_key_items(
-                        query_text, extract_type, chapter["title"]
+                    query_text = _query_text(st.session_state.summarizer, text)
+                st.write_stream(
+                    st.session_state.summarizer.extract_key_items(
+                        query_text, extract_type, chapter["title"], stream=True
                     )
-                    st.markdown(result)
+                )
+
+        # All four categories from one request — kept per chapter, so
+        # switching between them afterwards costs nothing
+        extract_all_key = (
+            st.session_state.pdf_filename, idx,
+            getattr(st.session_state.summarizer, "model_name", ""),
+        )
+        if st.button("🧰 Extract All (one request)", use_container_width=True):
+            if not st.session_state.summarizer:
+                st.error("❌ Please enter your Gemini API key in the sidebar")
+            else:
+                with st.spinner("Extracting everything with Gemini..."):
+                    query_text = _query_text(st.session_state.summarizer, text)
+                    results = st.session_state.summarizer.extract_all(query_text, chapter["title"])
+                if any(r.startswith("❌") for r in results.values()):
+                    st.error(next(r for r in results.values() if r.startswith("❌")))
+                else:
+                    st.session_state.extract_all_results[extract_all_key] = results
+
+        all_results = st.session_state.extract_all_results.get(extract_all_key)
+        if all_results:
+            for result_tab, key in zip(
+                st.tabs(list(EXTRACT_TYPE_LABELS.values())),
+                EXTRACT_TYPE_LABELS,
+            ):
+                with result_tab:
+                    st.markdown(all_results[key])
 
     # ── Command Tracking Index ─────────────────────────────────────────────────
     st.divider()
@@ -1112,7 +1708,8 @@ with tab_extract:
     all_by_chapter = registry.get_all_commands_by_chapter()
 
     if all_by_chapter:
-        total_cmds = len(registry.get_all_commands())
+        info_map = registry.get_all_info_dict()
+        total_cmds = len(info_map)
         new_in_current = registry.get_new_commands(idx)
         st.markdown(
             f"**{total_cmds} total commands tracked** across "
@@ -1133,14 +1730,16 @@ with tab_extract:
                 f"{icon} {ch_title} — {len(cmds)} commands {label}",
                 expanded=is_current,
             ):
-                # Display as a compact list with short descriptions
+                # Display as a compact grid with short descriptions (one element per chapter)
+                cells = []
                 for cmd_name in cmds:
-                    info = registry.get_command_info(cmd_name)
+                    info = info_map.get(cmd_name)
                     n_chapters = len(info["chapters"]) if info else 1
                     badge = "📌" if n_chapters == 1 else f"🔄 ×{n_chapters}"
                     desc = CommandExtractor.get_description(cmd_name)
-                    desc_part = f" — {desc}" if desc else ""
-                    st.markdown(f"`{cmd_name}` {badge}{desc_part}")
+                    desc_part = f" — {html.escape(desc)}" if desc else ""
+                    cells.append(f"<div><code>{html.escape(cmd_name)}</code> {badge}{desc_part}</div>")
+                st.markdown(f'<div class="cmd-grid">{"".join(cells)}</div>', unsafe_allow_html=True)
     else:
         st.info(
             "No commands tracked yet. Use **Extract Commands (Regex)** or "
@@ -1148,7 +1747,28 @@ with tab_extract:
             "building the index. It persists across sessions automatically."
         )
 
-    # ── Man Page Lookup ───────────────────────────────────────────────────────────────────
+
+# ── Man Page Lookup ──────────────────────────────────────────────────────────
+
+def _man_status_icon(cmd_name: str) -> str:
+    """Quick-lookup badge: pending, summarized, failed, or not looked up yet."""
+    if cmd_name in st.session_state.man_futures:
+        return "⏳"
+    cached = st.session_state.man_summaries.get(cmd_name)
+    if not cached:
+        return "📌"
+    return "✅" if cached.get("status") == "success" else "❌"
+
+
+def _queue_quick_lookup():
+    """Turn a pill click into a one-shot lookup and clear the selection."""
+    st.session_state.man_quick_pick = st.session_state.man_quick_pills
+    st.session_state.man_quick_pills = None
+
+
+@st.fragment
+def _man_lookup_panel(idx: int, chapter: dict, text: str):
+    """Man page lookup — its own fragment so lookups don't rerun the extract panel."""
     st.divider()
     st.subheader("📖 Man Page Lookup")
     st.caption(
@@ -1170,65 +1790,57 @@ with tab_extract:
     with man_col_quick:
         # Auto-detect commands from chapter for quick buttons
         st.caption("Quick lookup — commands found in this chapter:")
-        extractor = CommandExtractor()
-        detected = extractor.extract_from_text(text)
-        detected_names = sorted(set(c.command for c in detected))[:20]
+        detected_names = _detected_command_names(
+            st.session_state.pdf_filename, idx, (chapter["start_page"], chapter["end_page"]), text
+        )
 
         if detected_names:
-            # Render as a grid of buttons
-            btn_cols = st.columns(min(len(detected_names), 6))
-            for c_idx, cmd_name in enumerate(detected_names):
-                col = btn_cols[c_idx % len(btn_cols)]
-                with col:
-                    cached = st.session_state.man_summaries.get(cmd_name)
-                    icon = "✅" if cached and cached.get("status") == "success" else "❌" if cached and cached.get("status") == "error" else "📌"
-                    if st.button(f"{icon} {cmd_name}", key=f"man_quick_{cmd_name}", use_container_width=True):
-                        man_command = cmd_name
-                        man_lookup_btn = True
+            # One wrapping pills widget instead of a column grid of buttons
+            st.pills(
+                "Quick lookup",
+                detected_names,
+                format_func=lambda name: f"{_man_status_icon(name)} {name}",
+                key="man_quick_pills",
+                on_change=_queue_quick_lookup,
+                label_visibility="collapsed",
+            )
+            picked = st.session_state.pop("man_quick_pick", None)
+            if picked:
+                man_command = picked
+                man_lookup_btn = True
         else:
             st.caption("_No commands detected yet — run an extraction above first, or type a command manually._")
 
-    # Process man page lookup
+    # Process man page lookup — fetch + summarize run on a worker thread
     if man_lookup_btn and man_command:
         cmd = man_command.strip().split()[0]  # Take first word only
+        already_known = cmd in st.session_state.man_summaries or cmd in st.session_state.man_futures
 
-        # Check cache first
-        if cmd in st.session_state.man_summaries:
-            cached = st.session_state.man_summaries[cmd]
-            if cached["status"] == "success":
-                st.markdown(cached["summary"])
-                st.caption(f"_Source: {cached.get('source', 'cached')} man page • Cached_")
-            else:
-                st.error(cached["summary"])
+        if not already_known and not st.session_state.summarizer:
+            st.error("❌ Please enter your Gemini API key in the sidebar first")
         else:
-            if not st.session_state.summarizer:
-                st.error("❌ Please enter your Gemini API key in the sidebar first")
-            else:
-                with st.spinner(f"Fetching man page for `{cmd}`..."):
-                    result = fetch_man_page(cmd)
+            st.session_state.man_active = cmd
+            if not already_known:
+                st.session_state.man_futures[cmd] = _man_page_executor().submit(
+                    _fetch_and_summarize_man_page, st.session_state.summarizer, cmd
+                )
 
-                if result["success"]:
-                    with st.spinner(f"Summarizing `{cmd}` man page with Gemini..."):
-                        summary = st.session_state.summarizer.summarize_man_page(
-                            cmd, result["text"]
-                        )
-                        st.session_state.man_summaries[cmd] = {
-                            "status": "success",
-                            "summary": summary,
-                            "source": result["source"],
-                        }
-                        st.markdown(summary)
-                        st.caption(f"_Source: {result['source']} man page_")
-
-                    # Offer to see the raw man page
-                    with st.expander(f"📄 View raw man page for `{cmd}`"):
-                        st.code(result["text"][:8000], language="text")
-                else:
-                    st.session_state.man_summaries[cmd] = {
-                        "status": "error",
-                        "summary": result["text"],
-                    }
-                    st.error(f"❌ `{cmd}` — {result['text']}")
+    if st.session_state.man_futures:
+        _poll_man_page_lookups()
+
+    active_cmd = st.session_state.man_active
+    if active_cmd in st.session_state.man_summaries:
+        result = st.session_state.man_summaries[active_cmd]
+        if result["status"] == "success":
+            st.markdown(result["summary"])
+            st.caption(f"_Source: {result.get('source', 'cached')} man page_")
+
+            # Offer to see the raw man page
+            if result.get("raw"):
+                with st.expander(f"📄 View raw man page for `{active_cmd}`"):
+                    st.code(result["raw"], language="text")
+        else:
+            st.error(f"❌ `{active_cmd}` — {result['summary']}")
 
     # Show all cached man summaries
     cached_cmds = [
@@ -1237,10 +1849,27 @@ with tab_extract:
     ]
     if cached_cmds:
         st.divider()
-        st.caption(f"📚 **{len(cached_cmds)} commands summarized** this session — click to review:")
+        st.caption(f"📚 **{len(cached_cmds)} commands summarized** — click to review:")
         for cmd_name in sorted(cached_cmds):
             with st.expander(f"`{cmd_name}`"):
-                st.markdown(st.session_state.man_summaries[cmd_name]["summary"])
+                _man_summary_preview(cmd_name)
+
+
+with tab_extract:
+    st.header("🔍 Extract Key Information")
+
+    if st.session_state.current_chapter_idx is None:
+        st.info("👈 Select a chapter from the **Chapters** tab first (click the 📖 button)")
+        st.stop()
+
+    idx = st.session_state.current_chapter_idx
+    chapter = st.session_state.chapters[idx]
+    text = st.session_state.chapter_text
+
+    st.markdown(f"**Extracting from:** {chapter['title']}")
+
+    _extract_panel(idx, chapter, text)
+    _man_lookup_panel(idx, chapter, text)
 
 # ── Footer ───────────────────────────────────────────────────────────────────
 
@@ -10,7 +10,18 @@ Tag format in summaries:
 """
 
 import re
+import sys
+from collections.abc import Mapping
 from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+
+# Aho-Corasick finds every keyword in one pass over the text
+try:
+    import ahocorasick
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:
+    _AHOCORASICK_AVAILABLE = False
 
 
 # ── Category Definitions ─────────────────────────────────────────────────────
@@ -25,7 +36,7 @@ class Category:
     priority: int = 10  # Lower = higher priority for ambiguous matches
 
 
-CATEGORIES: dict[str, Category] = {
+CATEGORIES: Mapping[str, Category] = MappingProxyType({
     "CMD": Category(
         tag="CMD",
         label="🖥️ Commands & Utilities",
@@ -160,10 +171,10 @@ CATEGORIES: dict[str, Category] = {
         ],
         priority=12,
     ),
-}
+})
 
-# Regex to detect tagged headings: ## [TAG] Title Text
-TAG_PATTERN = re.compile(r'^##\s+\[([A-Z]+)\]\s+(.+)$', re.MULTILINE)
+# Regex to detect tagged headings: ## [TAG] Title Text (matched against one line)
+TAG_PATTERN = re.compile(r'##\s+\[([A-Z]+)\]\s+(.+)')
 
 # All valid tag names for prompt generation
 ALL_TAGS = list(CATEGORIES.keys())
@@ -171,9 +182,9 @@ ALL_TAGS = list(CATEGORIES.keys())
 
 # ── Parsed Section ───────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(frozen=True)
 class CategorizedSection:
-    """A section of the summary with its assigned category."""
+    """A section of the summary with its assigned category (immutable — parses are shared)."""
     category_tag: str       # e.g. "CMD", "CONCEPT"
     title: str              # Section heading (without tag)
     content: str            # Full section content including heading
@@ -210,24 +221,41 @@ def parse_categorized_summary(summary_text: str) -> list[CategorizedSection]:
     Parse a summary into categorized sections.
 
     Works with both tagged summaries (from AI with [TAG] prefixes)
-    and untagged summaries (uses keyword-based fallback).
+    and untagged summaries (uses keyword-based fallback). Each distinct
+    text is parsed once; later calls reuse the cached sections.
     """
-    # Split by ## headings
-    sections_raw = re.split(r'(?=^## )', summary_text, flags=re.MULTILINE)
-    sections_raw = [s for s in sections_raw if s.strip()]
+    return list(_parse_categorized_summary(summary_text))
+
+
+@lru_cache(maxsize=128)
+def _parse_categorized_summary(summary_text: str) -> tuple[CategorizedSection, ...]:
+    """Uncached parse behind parse_categorized_summary."""
+    # Split by ## headings in one pass over the lines
+    sections_raw = []
+    buf: list[str] = []
+    for line in summary_text.split('\n'):
+        if line.startswith('## ') and buf:
+            sections_raw.append('\n'.join(buf))
+            buf = []
+        buf.append(line)
+    if buf:
+        sections_raw.append('\n'.join(buf))
 
     # Check if the first chunk is a preamble (no ## heading)
     result = []
     for section_text in sections_raw:
-        lines = section_text.strip().split('\n')
-        first_line = lines[0].strip()
+        stripped = section_text.strip()  # once per section — used for content too
+        if not stripped:
+            continue
+        nl = stripped.find('\n')
+        first_line = (stripped[:nl] if nl >= 0 else stripped).strip()
 
         if not first_line.startswith('## '):
             # Preamble / intro text without a heading
             result.append(CategorizedSection(
                 category_tag="OVERVIEW",
                 title="Introduction",
-                content=section_text.strip(),
+                content=stripped,
                 raw_heading="",
             ))
             continue
@@ -235,7 +263,8 @@ def parse_categorized_summary(summary_text: str) -> list[CategorizedSection]:
         # Try to extract tag from heading: ## [TAG] Title
         tag_match = TAG_PATTERN.match(first_line)
         if tag_match:
-            tag = tag_match.group(1).upper()
+            # Interned so tag comparisons downstream are pointer checks
+            tag = sys.intern(tag_match.group(1).upper())
             title = tag_match.group(2).strip()
             # Validate tag
             if tag not in CATEGORIES:
@@ -248,11 +277,51 @@ def parse_categorized_summary(summary_text: str) -> list[CategorizedSection]:
         result.append(CategorizedSection(
             category_tag=tag,
             title=title,
-            content=section_text.strip(),
+            content=stripped,
             raw_heading=first_line,
         ))
 
-    return result
+    return tuple(result)
+
+
+# Priority adjustment per tag (lower priority value = small bonus)
+_PRIORITY_BONUS = {tag: (15 - cat.priority) * 0.1 for tag, cat in CATEGORIES.items()}
+
+# Keywords lowercased once, for the fallback scan
+_KEYWORDS_LOWER = {tag: tuple(kw.lower() for kw in cat.keywords) for tag, cat in CATEGORIES.items()}
+
+
+def _build_keyword_automaton():
+    """Automaton mapping each lowercased keyword to the tags that list it."""
+    tags_by_keyword: dict[str, list[str]] = {}
+    for tag, keywords in _KEYWORDS_LOWER.items():
+        for kw in keywords:
+            tags_by_keyword.setdefault(kw, []).append(tag)
+
+    automaton = ahocorasick.Automaton()
+    for kw, tags in tags_by_keyword.items():
+        automaton.add_word(kw, (kw, tags))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton() if _AHOCORASICK_AVAILABLE else None
+
+
+def _keywords_in(text: str) -> dict[str, list[str]]:
+    """Distinct keywords found in text, each with the tags that list it."""
+    return {kw: tags for _, (kw, tags) in _KEYWORD_AUTOMATON.iter(text)}
+
+
+def _best_tag(scores) -> str:
+    """Highest-scoring tag; the first one wins ties, in CATEGORIES order."""
+    best_tag = "CONCEPT"
+    best_score = 0
+    for tag, score in scores:
+        if score > best_score:
+            best_score = score
+            best_tag = tag
+    return best_tag
 
 
 def _categorize_by_keywords(heading: str, content: str) -> str:
@@ -261,23 +330,29 @@ def _categorize_by_keywords(heading: str, content: str) -> str:
     Returns the best-matching category tag.
     """
     # Combine heading (weighted more) and first ~500 chars of content
-    search_text = (heading.lower() + " " + heading.lower() + " " +
-                   content[:500].lower())
+    heading_lower = heading.lower()
+    search_text = heading_lower + " " + heading_lower + " " + content[:500].lower()
+
+    if _KEYWORD_AUTOMATON is not None:
+        scores = dict(_PRIORITY_BONUS)
+        for tags in _keywords_in(search_text).values():
+            for tag in tags:
+                scores[tag] += 1
+        # Bonus for keywords appearing in the heading itself
+        for tags in _keywords_in(heading_lower).values():
+            for tag in tags:
+                scores[tag] += 2
+        return _best_tag(scores.items())
 
     best_tag = "CONCEPT"
     best_score = 0
-
-    for tag, cat in CATEGORIES.items():
-        score = 0
-        for kw in cat.keywords:
-            if kw.lower() in search_text:
+    for tag, keywords in _KEYWORDS_LOWER.items():
+        score = _PRIORITY_BONUS[tag]
+        for kw in keywords:
+            if kw in search_text:
                 score += 1
-                # Bonus for keywords appearing in the heading itself
-                if kw.lower() in heading.lower():
+                if kw in heading_lower:
                     score += 2
-        # Adjust by priority (lower priority value = small bonus)
-        score += (15 - cat.priority) * 0.1
-
         if score > best_score:
             best_score = score
             best_tag = tag
@@ -303,7 +378,8 @@ def filter_sections(
     """Filter sections to only include those matching selected category tags."""
     if not selected_tags:
         return sections
-    return [s for s in sections if s.category_tag in selected_tags]
+    wanted = frozenset(selected_tags)
+    return [s for s in sections if s.category_tag in wanted]
 
 
 def rebuild_summary_text(sections: list[CategorizedSection]) -> str:
@@ -4,30 +4,251 @@ Handles chapter state: saving, loading, verification status,
 caching extracted text per chapter, and the book library.
 """
 
+import contextlib
+import copy
 import json
 import os
 import shutil
 import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+# orjson reads and writes the chapter/library JSON several times faster
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
+# zstandard compresses cached chapter text faster than zlib at a similar ratio
+try:
+    import zstandard
+    _ZSTD_AVAILABLE = True
+except ImportError:
+    _ZSTD_AVAILABLE = False
+
 
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache")
 BOOKS_DIR = os.path.join(CACHE_DIR, "books")
 LIBRARY_FILE = os.path.join(CACHE_DIR, "library.json")
+MAN_DIR = os.path.join(CACHE_DIR, "man")
+MEDIA_DIR = os.path.join(CACHE_DIR, "media")
+DESCRIPTIONS_DIR = os.path.join(CACHE_DIR, "descriptions")
+SUMMARIES_DIR = os.path.join(CACHE_DIR, "summaries")  # old home of content-keyed summaries
+CACHE_DB = os.path.join(CACHE_DIR, "cache.sqlite")
+SUMMARY_CACHE_MAX_ENTRIES = 500  # content-keyed summaries kept; least recently used go first
+MEDIA_CACHE_MAX_ENTRIES = 2000  # stored images/tables kept in MEDIA_DIR, same policy
+DESCRIPTIONS_CACHE_MAX_ENTRIES = 5000  # Gemini image/table descriptions kept, same policy
+
+
+_CACHE_READY = False  # set once the cache directories exist
 
 
 def _ensure_cache_dir():
-    """Create cache directory if it doesn't exist."""
+    """Create cache directory if it doesn't exist (checked once per process)."""
+    global _CACHE_READY
+    if _CACHE_READY:
+        return
     os.makedirs(CACHE_DIR, exist_ok=True)
     os.makedirs(BOOKS_DIR, exist_ok=True)
+    _CACHE_READY = True
+
+
+# Read once at import (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _atomic_write_bytes(path: str, data: bytes):
+    """
+    Write a file via a unique temp file in the same directory plus
+    os.replace, so readers see either the old or the new contents — never
+    a partial write. The file gets the usual umask-based mode rather than
+    mkstemp's 0600.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        if hasattr(os, "fchmod"):  # POSIX only
+            os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _write_json(path: str, data, indent: bool = False):
+    """Write data as UTF-8 JSON (2-space indented if requested), atomically."""
+    if _ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        raw = orjson.dumps(data, option=option)
+    else:
+        raw = json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+    _atomic_write_bytes(path, raw)
 
 
+def _read_json(path: str):
+    """Read a JSON file. Raises OSError / ValueError like json.load."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return orjson.loads(raw) if _ORJSON_AVAILABLE else json.loads(raw)
+
+
+@lru_cache(maxsize=256)
 def _get_book_id(filename: str) -> str:
     """Generate a safe ID for a book based on filename."""
     return hashlib.md5(filename.encode()).hexdigest()[:12]
 
 
+# ── Chapter text / summary store ─────────────────────────────────────────────
+# One SQLite table instead of a .txt/.md file per chapter and depth, so a
+# book's entries are an indexed lookup rather than a scan of CACHE_DIR.
+
+_db_conn: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()  # one shared connection, used from worker threads too
+_migrated_books: set[str] = set()
+
+
+def _db() -> sqlite3.Connection:
+    """Open the cache database on first use."""
+    global _db_conn
+    if _db_conn is None:
+        _ensure_cache_dir()
+        conn = sqlite3.connect(CACHE_DB, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " book_id TEXT NOT NULL, kind TEXT NOT NULL, chapter INTEGER NOT NULL,"
+            " depth TEXT NOT NULL, payload TEXT NOT NULL,"
+            " PRIMARY KEY (book_id, kind, chapter, depth)) WITHOUT ROWID"
+        )
+        # Summaries keyed by content (get_summary_content_key), with the book
+        # that produced them for per-book clearing and a last-used time for LRU
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS content_summaries ("
+            " key TEXT PRIMARY KEY, book_id TEXT, payload TEXT NOT NULL, mtime REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS content_summaries_book ON content_summaries (book_id)"
+        )
+        conn.commit()
+        _db_conn = conn
+    return _db_conn
+
+
+def _migrate_legacy_files(book_id: str):
+    """Move a book's old per-chapter .txt/.md cache files into the database (once)."""
+    if book_id in _migrated_books:
+        return
+    # Checked again and marked under the lock, so a worker thread and the
+    # foreground thread can't both import (and then delete) the same files
+    with _db_lock:
+        if book_id in _migrated_books:
+            return
+        prefix = f"{book_id}_ch"
+        rows, paths = [], []
+        with os.scandir(CACHE_DIR) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.startswith(prefix):
+                    continue
+                stem, ext = os.path.splitext(name[len(prefix):])
+                ch_part, _, depth = stem.partition("_")
+                if not ch_part.isdigit() or ext not in (".txt", ".md"):
+                    continue
+                if (ext == ".md") != bool(depth):
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        payload = f.read()
+                except FileNotFoundError:
+                    continue
+                kind = "summary" if ext == ".md" else "text"
+                rows.append((book_id, kind, int(ch_part), depth, payload))
+                paths.append(entry.path)
+
+        if rows:
+            conn = _db()
+            # Entries already in the database are newer than the files
+            conn.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        _migrated_books.add(book_id)
+
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"  # start of every zstd frame; zlib streams start with 0x78
+
+
+def _pack_text(text: str) -> bytes:
+    """Compress text for storage (zstd level 3, or zlib when zstandard is missing)."""
+    raw = text.encode("utf-8")
+    if _ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return zlib.compress(raw, 3)
+
+
+def _unpack_text(payload) -> Optional[str]:
+    """
+    Inverse of _pack_text. Plain str payloads (stored before compression)
+    pass through; zstd data without zstandard installed counts as a miss.
+    """
+    if isinstance(payload, str):
+        return payload
+    if payload.startswith(_ZSTD_MAGIC):
+        if not _ZSTD_AVAILABLE:
+            return None
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raw = zlib.decompress(payload)
+    return raw.decode("utf-8")
+
+
+def _store_blob(filename: str, kind: str, chapter_index: int, depth: str, payload: str | bytes):
+    """Insert or replace one cached entry of a book."""
+    book_id = _get_book_id(filename)
+    _ensure_cache_dir()
+    _migrate_legacy_files(book_id)
+    with _db_lock:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?)",
+            (book_id, kind, chapter_index, depth, payload),
+        )
+        conn.commit()
+
+
+def _load_blob(filename: str, kind: str, chapter_index: int, depth: str) -> str | bytes | None:
+    """Fetch one cached entry of a book, or None."""
+    book_id = _get_book_id(filename)
+    _ensure_cache_dir()
+    _migrate_legacy_files(book_id)
+    with _db_lock:
+        row = _db().execute(
+            "SELECT payload FROM blobs WHERE book_id = ? AND kind = ? AND chapter = ? AND depth = ?",
+            (book_id, kind, chapter_index, depth),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def get_chapters_path(filename: str) -> str:
+    """Path of a book's chapters JSON file (may not exist yet)."""
+    book_id = _get_book_id(filename)
+    return os.path.join(CACHE_DIR, f"{book_id}_chapters.json")
+
+
 def save_chapters(filename: str, chapters: list[dict]) -> str:
     """
     Save chapter data (with verification status) to a JSON file.
@@ -40,16 +261,15 @@ def save_chapters(filename: str, chapters: list[dict]) -> str:
         Path to the saved JSON file
     """
     _ensure_cache_dir()
-    book_id = _get_book_id(filename)
-    cache_path = os.path.join(CACHE_DIR, f"{book_id}_chapters.json")
+    cache_path = get_chapters_path(filename)
 
     data = {
         "filename": filename,
         "chapters": chapters,
     }
 
-    with open(cache_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    _write_json(cache_path, data, indent=True)
+    _sync_library_chapter_count(filename, len(chapters))
 
     return cache_path
 
@@ -62,13 +282,11 @@ def load_chapters(filename: str) -> Optional[list[dict]]:
         List of chapter dicts, or None if not found
     """
     _ensure_cache_dir()
-    book_id = _get_book_id(filename)
-    cache_path = os.path.join(CACHE_DIR, f"{book_id}_chapters.json")
+    cache_path = get_chapters_path(filename)
 
     if os.path.exists(cache_path):
-        with open(cache_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("chapters", [])
+        data = _read_json(cache_path)
+        return data.get("chapters", [])
 
     return None
 
@@ -106,21 +324,13 @@ def update_chapter_pages(filename: str, chapter_index: int, start_page: int, end
     return True
 
 
-def cache_chapter_text(filename: str, chapter_index: int, text: str) -> str:
+def cache_chapter_text(filename: str, chapter_index: int, text: str):
     """
-    Cache extracted chapter text for faster re-access.
-
-    Returns:
-        Path to the cached text file
+    Cache extracted chapter text (compressed) for faster re-access. Each
+    write is one transaction, so a background prefetch and a foreground
+    read of the same chapter never see a partial entry.
     """
-    _ensure_cache_dir()
-    book_id = _get_book_id(filename)
-    text_path = os.path.join(CACHE_DIR, f"{book_id}_ch{chapter_index}.txt")
-
-    with open(text_path, "w", encoding="utf-8") as f:
-        f.write(text)
-
-    return text_path
+    _store_blob(filename, "text", chapter_index, "", _pack_text(text))
 
 
 def load_cached_text(filename: str, chapter_index: int) -> Optional[str]:
@@ -130,48 +340,118 @@ def load_cached_text(filename: str, chapter_index: int) -> Optional[str]:
     Returns:
         Cached text or None
     """
-    _ensure_cache_dir()
-    book_id = _get_book_id(filename)
-    text_path = os.path.join(CACHE_DIR, f"{book_id}_ch{chapter_index}.txt")
+    payload = _load_blob(filename, "text", chapter_index, "")
+    return None if payload is None else _unpack_text(payload)
 
-    if os.path.exists(text_path):
-        with open(text_path, "r", encoding="utf-8") as f:
-            return f.read()
 
-    return None
+def cache_summary(filename: str, chapter_index: int, depth: str, summary: str):
+    """Cache a generated summary to avoid re-generating."""
+    _store_blob(filename, "summary", chapter_index, depth, summary)
 
 
-def cache_summary(filename: str, chapter_index: int, depth: str, summary: str) -> str:
+def load_cached_summary(filename: str, chapter_index: int, depth: str) -> Optional[str]:
     """
-    Cache a generated summary to avoid re-generating.
+    Load a cached summary if available.
 
     Returns:
-        Path to cached summary file
+        Cached summary string or None
     """
-    _ensure_cache_dir()
-    book_id = _get_book_id(filename)
-    summary_path = os.path.join(CACHE_DIR, f"{book_id}_ch{chapter_index}_{depth}.md")
+    return _load_blob(filename, "summary", chapter_index, depth)
 
-    with open(summary_path, "w", encoding="utf-8") as f:
-        f.write(summary)
 
-    return summary_path
+def get_summary_content_key(text: str, depth: str, instructions: str, model: str) -> str:
+    """
+    Content-addressed key for a summary: same chapter text, depth, custom
+    instructions and model give the same key, whatever the book is called.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in (depth, instructions, model, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
 
 
-def load_cached_summary(filename: str, chapter_index: int, depth: str) -> Optional[str]:
+def cache_summary_by_content(key: str, summary: str, filename: Optional[str] = None):
     """
-    Load a cached summary if available.
+    Cache a summary under its content key (see get_summary_content_key).
+    When filename is given, the entry belongs to that book, so
+    clear_cache(filename) drops it too. Only the SUMMARY_CACHE_MAX_ENTRIES
+    most recently used entries are kept.
+    """
+    book_id = _get_book_id(filename) if filename else None
+    with _db_lock:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO content_summaries VALUES (?, ?, ?, ?)",
+            (key, book_id, summary, time.time()),
+        )
+        conn.execute(
+            "DELETE FROM content_summaries WHERE key IN ("
+            " SELECT key FROM content_summaries ORDER BY mtime DESC LIMIT -1 OFFSET ?)",
+            (SUMMARY_CACHE_MAX_ENTRIES,),
+        )
+        conn.commit()
+
+
+def load_summary_by_content(key: str) -> Optional[str]:
+    """
+    Load a summary cached under a content key.
 
     Returns:
         Cached summary string or None
     """
-    _ensure_cache_dir()
+    with _db_lock:
+        conn = _db()
+        row = conn.execute(
+            "SELECT payload FROM content_summaries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        # Mark as recently used so pruning keeps it
+        conn.execute(
+            "UPDATE content_summaries SET mtime = ? WHERE key = ?", (time.time(), key)
+        )
+        conn.commit()
+    return row[0]
+
+
+def list_cached_summaries(filename: str) -> dict[tuple[int, str], dict]:
+    """
+    Index every cached summary of a book with a single query.
+    Summary bodies are not read — use load_cached_summary for that.
+
+    Returns:
+        Dict mapping (chapter_index, depth) -> {"size": int}
+    """
     book_id = _get_book_id(filename)
-    summary_path = os.path.join(CACHE_DIR, f"{book_id}_ch{chapter_index}_{depth}.md")
+    _ensure_cache_dir()
+    _migrate_legacy_files(book_id)
+    with _db_lock:
+        rows = _db().execute(
+            "SELECT chapter, depth, length(CAST(payload AS BLOB)) FROM blobs"
+            " WHERE book_id = ? AND kind = 'summary'",
+            (book_id,),
+        ).fetchall()
+    return {(chapter, depth): {"size": size} for chapter, depth, size in rows}
+
+
+def find_cached_summary(
+    filename: str, chapter_index: int, depths: list[str]
+) -> Optional[tuple[str, str]]:
+    """
+    Find the first cached summary for a chapter, trying depths in order.
+    Uses one index query instead of probing each depth.
+
+    Returns:
+        (depth, summary) tuple or None
+    """
+    available = list_cached_summaries(filename)
 
-    if os.path.exists(summary_path):
-        with open(summary_path, "r", encoding="utf-8") as f:
-            return f.read()
+    for depth in depths:
+        if (chapter_index, depth) in available:
+            summary = load_cached_summary(filename, chapter_index, depth)
+            if summary:
+                return depth, summary
 
     return None
 
@@ -185,14 +465,29 @@ def clear_cache(filename: Optional[str] = None):
 
     if filename:
         book_id = _get_book_id(filename)
-        for f in os.listdir(CACHE_DIR):
-            if f.startswith(book_id):
-                os.remove(os.path.join(CACHE_DIR, f))
+        with _db_lock:
+            conn = _db()
+            conn.execute("DELETE FROM blobs WHERE book_id = ?", (book_id,))
+            conn.execute("DELETE FROM content_summaries WHERE book_id = ?", (book_id,))
+            conn.commit()
+        with os.scandir(CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.name.startswith(book_id):
+                    os.remove(entry.path)
     else:
-        for f in os.listdir(CACHE_DIR):
-            filepath = os.path.join(CACHE_DIR, f)
-            if os.path.isfile(filepath):
-                os.remove(filepath)
+        with _db_lock:
+            conn = _db()
+            conn.execute("DELETE FROM blobs")
+            conn.execute("DELETE FROM content_summaries")
+            conn.commit()
+        shutil.rmtree(SUMMARIES_DIR, ignore_errors=True)
+        shutil.rmtree(MEDIA_DIR, ignore_errors=True)
+        shutil.rmtree(DESCRIPTIONS_DIR, ignore_errors=True)
+        db_files = {os.path.basename(CACHE_DB) + suffix for suffix in ("", "-wal", "-shm")}
+        with os.scandir(CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name not in db_files:
+                    os.remove(entry.path)
 
 
 def save_command_registry(filename: str, registry_data: dict) -> str:
@@ -210,8 +505,7 @@ def save_command_registry(filename: str, registry_data: dict) -> str:
     book_id = _get_book_id(filename)
     path = os.path.join(CACHE_DIR, f"{book_id}_commands.json")
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(registry_data, f, indent=2, ensure_ascii=False)
+    _write_json(path, registry_data, indent=True)
 
     return path
 
@@ -228,53 +522,214 @@ def load_command_registry(filename: str) -> Optional[dict]:
     path = os.path.join(CACHE_DIR, f"{book_id}_commands.json")
 
     if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return _read_json(path)
 
     return None
 
 
-def get_all_books() -> list[dict]:
+def cache_media_bytes(data: bytes) -> tuple[str, str]:
     """
-    List all books that have cached chapter data.
+    Store extracted image bytes once, addressed by their content hash.
 
     Returns:
-        List of dicts with filename and chapter count
+        (digest, path) — identical images share one file
     """
-    _ensure_cache_dir()
-    books = []
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    path = os.path.join(MEDIA_DIR, f"{digest}.bin")
+
+    try:
+        os.utime(path)  # already stored — mark as recently used
+    except FileNotFoundError:
+        os.makedirs(MEDIA_DIR, exist_ok=True)
+        _atomic_write_bytes(path, data)
+        _prune_dir_lru(MEDIA_DIR, MEDIA_CACHE_MAX_ENTRIES)
+
+    return digest, path
+
+
+def _prune_dir_lru(directory: str, max_entries: int):
+    """Delete the least recently used files (by mtime) beyond max_entries."""
+    with os.scandir(directory) as entries:
+        files = [(entry.stat().st_mtime_ns, entry.path) for entry in entries if entry.is_file()]
+    excess = len(files) - max_entries
+    if excess <= 0:
+        return
+    files.sort()
+    for _, path in files[:excess]:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
 
-    for f in os.listdir(CACHE_DIR):
-        if f.endswith("_chapters.json"):
-            filepath = os.path.join(CACHE_DIR, f)
-            with open(filepath, "r", encoding="utf-8") as fp:
-                data = json.load(fp)
-                books.append({
-                    "filename": data.get("filename", "Unknown"),
-                    "chapters": len(data.get("chapters", [])),
-                })
 
-    return books
+def load_media_bytes(path: str) -> Optional[bytes]:
+    """Read image bytes stored by cache_media_bytes, or None if missing."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    with contextlib.suppress(OSError):
+        os.utime(path)  # keep images still in use ahead of the pruning cap
+    return data
+
+
+def cache_media_description(digest: str, description: str) -> str:
+    """
+    Cache a Gemini description for an image/table, keyed by its content hash
+    (the digest from cache_media_bytes), so repeats are never re-described.
+
+    Returns:
+        Path to the cached description file
+    """
+    os.makedirs(DESCRIPTIONS_DIR, exist_ok=True)
+    path = os.path.join(DESCRIPTIONS_DIR, f"{digest}.json")
+
+    _write_json(path, {"description": description})
+    _prune_dir_lru(DESCRIPTIONS_DIR, DESCRIPTIONS_CACHE_MAX_ENTRIES)
+
+    return path
+
+
+def load_media_descriptions(digests: list[str]) -> dict[str, str]:
+    """
+    Load cached descriptions for the given content hashes.
+
+    Returns:
+        Dict mapping digest -> description for every digest that is cached
+    """
+    found = {}
+    for digest in digests:
+        path = os.path.join(DESCRIPTIONS_DIR, f"{digest}.json")
+        try:
+            found[digest] = _read_json(path)["description"]
+        except (OSError, ValueError, KeyError):
+            continue
+        with contextlib.suppress(OSError):
+            os.utime(path)  # mark as recently used for the pruning cap
+    return found
+
+
+def _get_man_summary_path(command: str) -> Optional[str]:
+    """Path of a command's cached man summary, or None for unsafe names."""
+    if not command or os.path.basename(command) != command or command.startswith("."):
+        return None
+    return os.path.join(MAN_DIR, f"{command}.json")
+
+
+def save_man_summary(command: str, data: dict) -> Optional[str]:
+    """
+    Cache a man page summary. Shared by all books — man pages don't depend on the PDF.
+
+    Args:
+        command: Command name (e.g., "grep")
+        data: {"summary": str, "source": str, "raw": str}
+
+    Returns:
+        Path to the saved file, or None if the command name is unsafe
+    """
+    path = _get_man_summary_path(command)
+    if not path:
+        return None
+    os.makedirs(MAN_DIR, exist_ok=True)
+
+    _write_json(path, {k: data.get(k, "") for k in ("summary", "source", "raw")})
+
+    return path
+
+
+def load_man_summary(command: str) -> Optional[dict]:
+    """
+    Load a cached man page summary.
+
+    Returns:
+        {"status": "success", "summary", "source", "raw"} or None
+    """
+    path = _get_man_summary_path(command)
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        data = _read_json(path)
+    except (OSError, ValueError):
+        return None
+    return {"status": "success", **data}
+
+
+def load_all_man_summaries() -> dict[str, dict]:
+    """
+    Load every cached man page summary with a single directory scan.
+
+    Returns:
+        Dict mapping command -> {"status": "success", "summary", "source", "raw"}
+    """
+    if not os.path.isdir(MAN_DIR):
+        return {}
+
+    summaries = {}
+    with os.scandir(MAN_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json"):
+                command = entry.name[:-len(".json")]
+                data = load_man_summary(command)
+                if data:
+                    summaries[command] = data
+
+    return summaries
+
+
+def get_all_books() -> list[dict]:
+    """
+    List all books in the library with their chapter counts.
+    Read from the library index — no chapter files are opened.
+
+    Returns:
+        List of dicts with filename and chapter count
+    """
+    return [
+        {"filename": info.get("filename", "Unknown"), "chapters": info.get("num_chapters", 0)}
+        for info in _load_library().get("books", {}).values()
+    ]
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # Book Library — persistent book history with covers
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Parsed library.json, reused until the file's (mtime, size) changes
+_library_cache: dict = {"stamp": None, "data": None}
+
+
+def _library_stamp() -> tuple[int, int]:
+    stat = os.stat(LIBRARY_FILE)
+    return stat.st_mtime_ns, stat.st_size
+
+
 def _load_library() -> dict:
-    """Load the library index file."""
+    """
+    Load the library index file. Parsed once per file version; callers get
+    a copy they are free to mutate.
+    """
     _ensure_cache_dir()
-    if os.path.exists(LIBRARY_FILE):
-        with open(LIBRARY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"books": {}}
+    try:
+        stamp = _library_stamp()
+    except FileNotFoundError:
+        return {"books": {}}
+    if stamp != _library_cache["stamp"]:
+        _library_cache["data"] = _read_json(LIBRARY_FILE)
+        _library_cache["stamp"] = stamp
+    return copy.deepcopy(_library_cache["data"])
+
+
+def _format_last_opened(dt: datetime) -> str:
+    """Human-readable timestamp shown on library cards."""
+    return dt.strftime('%b %d, %Y %I:%M %p')
 
 
 def _save_library(library: dict):
     """Save the library index file."""
     _ensure_cache_dir()
-    with open(LIBRARY_FILE, "w", encoding="utf-8") as f:
-        json.dump(library, f, indent=2, ensure_ascii=False)
+    _write_json(LIBRARY_FILE, library, indent=True)
+    _library_cache["data"] = copy.deepcopy(library)
+    _library_cache["stamp"] = _library_stamp()
 
 
 def save_book_to_library(
@@ -285,6 +740,7 @@ def save_book_to_library(
     total_pages: int = 0,
     num_chapters: int = 0,
     cover_png_bytes: bytes | None = None,
+    content_hash: str = "",
 ) -> str:
     """
     Save a book to the persistent library.
@@ -300,7 +756,10 @@ def save_book_to_library(
         author: Author from metadata
         total_pages: Number of pages
         num_chapters: Number of detected chapters
-        cover_png_bytes: First-page PNG thumbnail (optional)
+        cover_png_bytes: First-page PNG thumbnail (optional — an existing
+                         cover on disk is kept when omitted)
+        content_hash: Hash from store_uploaded_pdf (optional — a previously
+                      recorded hash is kept when omitted)
 
     Returns:
         The permanent path to the stored PDF
@@ -309,18 +768,19 @@ def save_book_to_library(
     book_id = _get_book_id(filename)
 
     # Copy PDF to permanent storage
-    pdf_dest = os.path.join(BOOKS_DIR, f"{book_id}.pdf")
+    pdf_dest = get_book_pdf_path(filename)
     if not os.path.exists(pdf_dest):
-        shutil.copy2(pdf_source_path, pdf_dest)
+        shutil.copyfile(pdf_source_path, pdf_dest)
 
     # Save cover thumbnail
-    cover_path = os.path.join(BOOKS_DIR, f"{book_id}_cover.png")
+    cover_path = get_book_cover_path(filename)
     if cover_png_bytes and not os.path.exists(cover_path):
-        with open(cover_path, "wb") as f:
-            f.write(cover_png_bytes)
+        _atomic_write_bytes(cover_path, cover_png_bytes)
 
     # Update library index
     library = _load_library()
+    now = datetime.now()
+    previous = library.get("books", {}).get(book_id, {})
     library["books"][book_id] = {
         "filename": filename,
         "title": title or filename,
@@ -328,22 +788,34 @@ def save_book_to_library(
         "total_pages": total_pages,
         "num_chapters": num_chapters,
         "pdf_path": pdf_dest,
-        "cover_path": cover_path if cover_png_bytes else "",
-        "last_opened": datetime.now().isoformat(),
-        "added": library.get("books", {}).get(book_id, {}).get(
-            "added", datetime.now().isoformat()
-        ),
+        "cover_path": cover_path if os.path.exists(cover_path) else "",
+        "last_opened": now.isoformat(),
+        "last_opened_display": _format_last_opened(now),
+        "added": previous.get("added", now.isoformat()),
+        "content_hash": content_hash or previous.get("content_hash", ""),
     }
     _save_library(library)
     return pdf_dest
 
 
+def _sync_library_chapter_count(filename: str, num_chapters: int):
+    """Keep a library entry's num_chapters in step with its saved chapter list."""
+    book_id = _get_book_id(filename)
+    library = _load_library()
+    entry = library.get("books", {}).get(book_id)
+    if entry is not None and entry.get("num_chapters") != num_chapters:
+        entry["num_chapters"] = num_chapters
+        _save_library(library)
+
+
 def update_library_last_opened(filename: str):
     """Update the last_opened timestamp for a book."""
     book_id = _get_book_id(filename)
     library = _load_library()
     if book_id in library.get("books", {}):
-        library["books"][book_id]["last_opened"] = datetime.now().isoformat()
+        now = datetime.now()
+        library["books"][book_id]["last_opened"] = now.isoformat()
+        library["books"][book_id]["last_opened_display"] = _format_last_opened(now)
         _save_library(library)
 
 
@@ -353,7 +825,8 @@ def get_library_books() -> list[dict]:
 
     Returns:
         List of book dicts with: filename, title, author, total_pages,
-        num_chapters, pdf_path, cover_path, last_opened, added, book_id
+        num_chapters, pdf_path, cover_path, last_opened, last_opened_display,
+        added, book_id
     """
     library = _load_library()
     books = []
@@ -361,6 +834,14 @@ def get_library_books() -> list[dict]:
         # Only include books whose PDF still exists
         if os.path.exists(info.get("pdf_path", "")):
             entry = {**info, "book_id": book_id}
+            # Entries written before last_opened_display existed
+            if "last_opened_display" not in entry and entry.get("last_opened"):
+                try:
+                    entry["last_opened_display"] = _format_last_opened(
+                        datetime.fromisoformat(entry["last_opened"])
+                    )
+                except ValueError:
+                    pass
             books.append(entry)
 
     # Sort by last_opened descending
@@ -368,14 +849,123 @@ def get_library_books() -> list[dict]:
     return books
 
 
-def get_book_cover(filename: str) -> bytes | None:
-    """Load the cover thumbnail PNG for a book."""
+def get_book_pdf_path(filename: str) -> str:
+    """Path of a book's stored PDF in the library (may not exist yet)."""
+    return os.path.join(BOOKS_DIR, f"{_get_book_id(filename)}.pdf")
+
+
+def _hash_pdf(path: str) -> str:
+    """Content hash of a stored PDF, read in 1 MB chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _resolve_book_key(filename: str, content_hash: str) -> str:
+    """
+    Library key (the `filename` every cache is keyed by) for an uploaded PDF.
+
+    - Same content as a stored book → that book's key, so a renamed copy
+      reuses its chapters, summaries and command index
+    - Different content under a stored book's filename → a hash-suffixed key
+      instead of silently sharing (and corrupting) the other book's caches
+    """
+    library = _load_library()
+    books = library.get("books", {})
+
+    for entry in books.values():
+        if entry.get("content_hash") == content_hash:
+            return entry["filename"]
+
+    existing = books.get(_get_book_id(filename))
+    if not existing:
+        return filename
+
+    # Entries from before content hashing — hash the stored copy once
+    if not existing.get("content_hash") and os.path.exists(existing.get("pdf_path", "")):
+        existing["content_hash"] = _hash_pdf(existing["pdf_path"])
+        _save_library(library)
+
+    if existing.get("content_hash", content_hash) == content_hash:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem} ({content_hash[:8]}){ext}"
+
+
+def store_uploaded_pdf(fileobj, filename: str) -> tuple[str, str, str]:
+    """
+    Stream an uploaded PDF into the library, hashing it on the way.
+
+    Copies in 1 MB chunks through a 4 MB write buffer (never the whole file in
+    memory) to a temp file beside the library copies, then renames it into
+    place — or drops it when identical content is already stored.
+
+    Returns:
+        (book_key, pdf_path, content_hash) — book_key is the filename to key
+        caches by (see _resolve_book_key)
+    """
+    os.makedirs(BOOKS_DIR, exist_ok=True)
+    digest = hashlib.blake2b(digest_size=16)
+
+    fileobj.seek(0)
+    with tempfile.NamedTemporaryFile(
+        delete=False, suffix=".pdf", dir=BOOKS_DIR, buffering=4 * 1024 * 1024
+    ) as tmp:
+        while chunk := fileobj.read(1024 * 1024):
+            digest.update(chunk)
+            tmp.write(chunk)
+
+    content_hash = digest.hexdigest()
+    book_key = _resolve_book_key(filename, content_hash)
+    pdf_path = get_book_pdf_path(book_key)
+
+    if os.path.exists(pdf_path):
+        os.remove(tmp.name)
+    else:
+        # Same filesystem, so the finished file appears atomically
+        os.replace(tmp.name, pdf_path)
+
+    return book_key, pdf_path, content_hash
+
+
+def get_book_cover_path(filename: str) -> str:
+    """Path where a book's cover thumbnail PNG is stored (may not exist yet)."""
     book_id = _get_book_id(filename)
-    cover_path = os.path.join(BOOKS_DIR, f"{book_id}_cover.png")
-    if os.path.exists(cover_path):
-        with open(cover_path, "rb") as f:
-            return f.read()
-    return None
+    return os.path.join(BOOKS_DIR, f"{book_id}_cover.png")
+
+
+def save_book_cover(filename: str, cover_png_bytes: bytes) -> str:
+    """
+    Write a book's cover thumbnail. Written atomically so a library render
+    never reads a half-written PNG.
+
+    Returns:
+        Path to the cover file
+    """
+    os.makedirs(BOOKS_DIR, exist_ok=True)
+    cover_path = get_book_cover_path(filename)
+    _atomic_write_bytes(cover_path, cover_png_bytes)
+
+    return cover_path
+
+
+@lru_cache(maxsize=64)
+def _read_cover(cover_path: str, mtime_ns: int) -> bytes:
+    """Cover bytes for one file version — a rewritten cover changes the key."""
+    with open(cover_path, "rb") as f:
+        return f.read()
+
+
+def get_book_cover(filename: str) -> bytes | None:
+    """Load the cover thumbnail PNG for a book (read from disk once per version)."""
+    cover_path = get_book_cover_path(filename)
+    try:
+        mtime_ns = os.stat(cover_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _read_cover(cover_path, mtime_ns)
 
 
 def remove_book_from_library(filename: str):
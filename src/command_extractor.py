@@ -6,11 +6,40 @@ Includes CommandRegistry for tracking commands across chapters.
 """
 
 import re
+import string
 from dataclasses import dataclass, field
 from collections import OrderedDict
-
-
-@dataclass
+from functools import lru_cache
+from operator import attrgetter
+
+# Aho-Corasick finds every known command name in one pass over the text
+try:
+    import ahocorasick
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:
+    _AHOCORASICK_AVAILABLE = False
+
+# Compiled once — these run over every chapter's text
+BACKTICK_RE = re.compile(r'`([^`]+)`')
+WORD_RE = re.compile(r'\b[a-zA-Z_][\w.-]*\b')
+# Valid command names: an ASCII letter or underscore, then word characters,
+# dots or dashes — checked with set/str methods rather than a regex
+CMD_FIRST_CHARS = frozenset(string.ascii_letters + '_')
+CMD_PUNCT_DROP = str.maketrans('', '', '_.-')
+# Prompt prefixes stripped from monospace lines
+SHELL_PROMPTS = frozenset({'$ ', '# ', '% ', '> '})
+# Shell-prompt lines ("$ cmd" / "# cmd", possibly indented) and indented
+# code lines, found in one scan instead of a Python loop over every line
+CODE_LINE_RE = re.compile(
+    r'^[^\S\n]*[$#] (?P<prompt>[^\n]*)|^(?:    |\t)(?P<indented>[^\n]*)',
+    re.MULTILINE,
+)
+# Pipes, redirects (>, >>, 2>, &>, <, <<, <<<) and chaining (&&, ||, ;) —
+# everything from the first one on is dropped to leave the first command
+COMMAND_SEP_RE = re.compile(r'[|<>;]|&&')
+
+
+@dataclass(slots=True)
 class ExtractedCommand:
     """Represents an extracted command with context."""
     command: str
@@ -31,10 +60,14 @@ class CommandRegistry:
 
     def __init__(self):
         # command_name -> {"first_chapter_idx": int, "first_chapter_title": str,
-        #                  "chapters": [int], "flags_by_chapter": {idx: [flags]}}
+        #                  "chapters": [int], "flags_by_chapter": {idx: {flags}}}
         self._registry: dict[str, dict] = {}
         # chapter_idx -> [command_names first introduced in this chapter]
         self._introduced_in: dict[int, list[str]] = {}
+        # command_name -> set of the chapter indexes in its "chapters" list
+        self._chapter_sets: dict[str, set[int]] = {}
+        # _introduced_in with sorted keys and sorted names; None when stale
+        self._sorted_cache: dict[int, list[str]] | None = None
 
     def register_commands(
         self,
@@ -43,6 +76,7 @@ class CommandRegistry:
         chapter_title: str,
     ):
         """Register extracted commands from a chapter."""
+        self._sorted_cache = None
         for cmd in commands:
             name = cmd.command
             if name not in self._registry:
@@ -51,33 +85,44 @@ class CommandRegistry:
                     "first_chapter_idx": chapter_idx,
                     "first_chapter_title": chapter_title,
                     "chapters": [chapter_idx],
-                    "flags_by_chapter": {chapter_idx: cmd.flags},
+                    "flags_by_chapter": {chapter_idx: set(cmd.flags)},
                 }
                 self._introduced_in.setdefault(chapter_idx, []).append(name)
+                self._chapter_sets[name] = {chapter_idx}
             else:
                 entry = self._registry[name]
-                if chapter_idx not in entry["chapters"]:
+                chapter_set = self._chapter_sets[name]
+                if chapter_idx not in chapter_set:
+                    chapter_set.add(chapter_idx)
                     entry["chapters"].append(chapter_idx)
-                # Merge new flags
-                existing = set(entry["flags_by_chapter"].get(chapter_idx, []))
-                existing.update(cmd.flags)
-                entry["flags_by_chapter"][chapter_idx] = list(existing)
+                # Merge new flags (kept as a set; lists only when serialized)
+                entry["flags_by_chapter"].setdefault(chapter_idx, set()).update(cmd.flags)
 
     def get_new_commands(self, chapter_idx: int) -> list[str]:
         """Get commands first introduced in a specific chapter."""
-        return sorted(self._introduced_in.get(chapter_idx, []))
+        return list(self._sorted_introduced().get(chapter_idx, ()))
+
+    def _sorted_introduced(self) -> dict[int, list[str]]:
+        """_introduced_in ordered by chapter with each name list sorted (cached)."""
+        if self._sorted_cache is None:
+            self._sorted_cache = {
+                ch_idx: sorted(self._introduced_in[ch_idx])
+                for ch_idx in sorted(self._introduced_in)
+            }
+        return self._sorted_cache
 
     def get_all_commands_by_chapter(self) -> dict[int, list[str]]:
         """Get all commands grouped by the chapter they were introduced in."""
-        result = {}
-        for ch_idx in sorted(self._introduced_in.keys()):
-            result[ch_idx] = sorted(self._introduced_in[ch_idx])
-        return result
+        return {ch_idx: list(cmds) for ch_idx, cmds in self._sorted_introduced().items()}
 
     def get_command_info(self, command: str) -> dict | None:
         """Get tracking info for a specific command."""
         return self._registry.get(command)
 
+    def get_all_info_dict(self) -> dict[str, dict]:
+        """Get tracking info for every command in one mapping (command -> info)."""
+        return dict(self._registry)
+
     def get_all_commands(self) -> list[str]:
         """Get all registered command names sorted."""
         return sorted(self._registry.keys())
@@ -88,24 +133,32 @@ class CommandRegistry:
         Returns list of dicts: {chapter_idx, chapter_title, commands: [str]}
         """
         result = []
-        for ch_idx in sorted(self._introduced_in.keys()):
+        for ch_idx, cmds in self._sorted_introduced().items():
             if ch_idx > up_to_chapter:
                 break
             title = chapters[ch_idx]["title"] if ch_idx < len(chapters) else f"Chapter {ch_idx + 1}"
-            cmds = sorted(self._introduced_in[ch_idx])
             if cmds:
                 result.append({
                     "chapter_idx": ch_idx,
                     "chapter_title": title,
-                    "commands": cmds,
+                    "commands": list(cmds),
                     "is_current": ch_idx == up_to_chapter,
                 })
         return result
 
     def to_dict(self) -> dict:
         """Serialize for caching."""
+        registry = {
+            name: {
+                **entry,
+                "flags_by_chapter": {
+                    idx: sorted(flags) for idx, flags in entry["flags_by_chapter"].items()
+                },
+            }
+            for name, entry in self._registry.items()
+        }
         return {
-            "registry": self._registry,
+            "registry": registry,
             "introduced_in": {str(k): v for k, v in self._introduced_in.items()},
         }
 
@@ -114,7 +167,15 @@ class CommandRegistry:
         """Deserialize from cache."""
         obj = cls()
         obj._registry = data.get("registry", {})
+        for entry in obj._registry.values():
+            # JSON turns chapter keys into strings and flag sets into lists
+            entry["flags_by_chapter"] = {
+                int(idx): set(flags) for idx, flags in entry.get("flags_by_chapter", {}).items()
+            }
         obj._introduced_in = {int(k): v for k, v in data.get("introduced_in", {}).items()}
+        obj._chapter_sets = {
+            name: set(entry.get("chapters", [])) for name, entry in obj._registry.items()
+        }
         return obj
 
 
@@ -122,7 +183,7 @@ class CommandExtractor:
     """Extracts commands, flags, and code patterns from text."""
 
     # Common Linux/Unix commands for pattern matching
-    KNOWN_COMMANDS = {
+    KNOWN_COMMANDS: frozenset[str] = frozenset({
         "ls", "cd", "pwd", "mkdir", "rmdir", "rm", "cp", "mv", "touch",
         "cat", "less", "more", "head", "tail", "grep", "find", "locate",
         "which", "whereis", "man", "info", "help", "type", "alias",
@@ -145,7 +206,7 @@ class CommandExtractor:
         "test", "expr", "bc", "file", "stat", "ln", "readlink",
         "tput", "clear", "reset", "stty",
         "crontab", "at", "systemctl", "service", "journalctl",
-    }
+    })
 
     # Short one-liner descriptions for quick view
     COMMAND_DESCRIPTIONS: dict[str, str] = {
@@ -310,6 +371,16 @@ class CommandExtractor:
     # Common flags/options patterns
     FLAG_PATTERN = re.compile(r'(?<!\w)-{1,2}[a-zA-Z][\w-]*')
 
+    # Every known command as a standalone word, found in one scan of the text.
+    # Hyphenated names get their own pattern: "apt" also matches inside
+    # "apt-get", which one alternation would only report as "apt-get".
+    KNOWN_CMD_RE = re.compile(r'\b(' + '|'.join(
+        map(re.escape, sorted((c for c in KNOWN_COMMANDS if '-' not in c), key=len, reverse=True))
+    ) + r')\b')
+    KNOWN_HYPHENATED_CMD_RE = re.compile(r'\b(' + '|'.join(
+        map(re.escape, sorted((c for c in KNOWN_COMMANDS if '-' in c), key=len, reverse=True))
+    ) + r')\b')
+
     def __init__(self):
         pass
 
@@ -329,69 +400,95 @@ class CommandExtractor:
         """
         commands = []
         seen = set()
+        # Hoisted for the per-line / per-match loops below
+        known = self.KNOWN_COMMANDS
+        flag_pattern = self.FLAG_PATTERN
+        parse = self._parse_command_string
 
         # Pattern 1: backtick-wrapped commands like `ls -la`
-        backtick_cmds = re.findall(r'`([^`]+)`', text)
+        backtick_cmds = BACKTICK_RE.findall(text)
         for cmd_text in backtick_cmds:
-            cmd = self._parse_command_string(cmd_text)
+            cmd = parse(cmd_text)
             if cmd and cmd.command not in seen:
                 seen.add(cmd.command)
                 commands.append(cmd)
 
         # Pattern 2: Lines that look like shell commands
         # (start with $ or # prompt, or are indented code)
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            stripped = line.strip()
+        for match in CODE_LINE_RE.finditer(text):
+            prompt_cmd = match.group("prompt")
 
             # Shell prompt lines
-            if stripped.startswith('$ ') or stripped.startswith('# '):
-                cmd_text = stripped[2:].strip()
-                cmd = self._parse_command_string(cmd_text)
+            if prompt_cmd is not None:
+                cmd = parse(prompt_cmd.strip())
                 if cmd and cmd.command not in seen:
-                    # Get surrounding context
-                    context_start = max(0, i - 1)
-                    context_end = min(len(lines), i + 2)
-                    cmd.context = '\n'.join(lines[context_start:context_end])
+                    # Get surrounding context — previous, current and next line
+                    line_start = match.start()
+                    context_start = text.rfind('\n', 0, max(0, line_start - 1)) + 1 if line_start else 0
+                    line_end = text.find('\n', line_start)
+                    context_end = text.find('\n', line_end + 1) if line_end >= 0 else -1
+                    cmd.context = text[context_start:context_end if context_end >= 0 else len(text)]
                     seen.add(cmd.command)
                     commands.append(cmd)
 
             # Indented lines that start with a known command
-            elif (line.startswith('    ') or line.startswith('\t')) and stripped:
-                first_word = stripped.split()[0] if stripped.split() else ""
-                if first_word in self.KNOWN_COMMANDS:
-                    cmd = self._parse_command_string(stripped)
+            else:
+                stripped = match.group("indented").strip()
+                parts = stripped.split(None, 1)
+                if parts and parts[0] in known:
+                    cmd = parse(stripped)
                     if cmd and cmd.command not in seen:
                         seen.add(cmd.command)
                         commands.append(cmd)
 
-        # Pattern 3: Known commands mentioned in prose
-        for cmd_name in self.KNOWN_COMMANDS:
-            # Look for the command as a standalone word
-            pattern = rf'\b{re.escape(cmd_name)}\b'
-            matches = list(re.finditer(pattern, text))
-            if matches and cmd_name not in seen:
-                # Check if followed by flags
-                for match in matches:
-                    after = text[match.end():match.end() + 50]
-                    flags = self.FLAG_PATTERN.findall(after)
-                    flags = [f for f in flags if len(f) <= 20]  # Filter noise
-
-                    # Get context (surrounding sentence)
-                    start = max(0, match.start() - 80)
-                    end = min(len(text), match.end() + 80)
-                    context = text[start:end].strip()
-
-                    if cmd_name not in seen:
-                        commands.append(ExtractedCommand(
-                            command=cmd_name,
-                            flags=flags[:10],
-                            context=context
-                        ))
-                        seen.add(cmd_name)
-                    break
-
-        return sorted(commands, key=lambda c: c.command)
+        # Pattern 3: Known commands mentioned in prose — first mention of each
+        for cmd_name, match_start, match_end in self._known_command_mentions(text):
+            if cmd_name in seen:
+                continue
+            # Check if followed by flags
+            after = text[match_end:match_end + 50]
+            flags = flag_pattern.findall(after)
+            flags = [f for f in flags if len(f) <= 20]  # Filter noise
+
+            # Get context (surrounding sentence)
+            start = max(0, match_start - 80)
+            end = min(len(text), match_end + 80)
+            context = text[start:end].strip()
+
+            commands.append(ExtractedCommand(
+                command=cmd_name,
+                flags=flags[:10],
+                context=context
+            ))
+            seen.add(cmd_name)
+
+        commands.sort(key=attrgetter("command"))
+        return commands
+
+    @classmethod
+    def _known_command_mentions(cls, text: str):
+        """
+        Yield (command, start, end) for every standalone known command name.
+
+        Uses the Aho-Corasick automaton when pyahocorasick is installed,
+        otherwise the two KNOWN_CMD regexes. Either way a name must be a whole
+        word, so "apt" is still reported inside "apt-get".
+        """
+        if not _AHOCORASICK_AVAILABLE:
+            for pattern in (cls.KNOWN_CMD_RE, cls.KNOWN_HYPHENATED_CMD_RE):
+                for match in pattern.finditer(text):
+                    yield match.group(1), match.start(), match.end()
+            return
+
+        text_len = len(text)
+        for last, cmd_name in _known_command_automaton().iter(text):
+            start = last + 1 - len(cmd_name)
+            end = last + 1
+            if start and _is_word_char(text[start - 1]):
+                continue
+            if end < text_len and _is_word_char(text[end]):
+                continue
+            yield cmd_name, start, end
 
     def extract_from_blocks(self, blocks: list[dict]) -> list[ExtractedCommand]:
         """
@@ -403,6 +500,10 @@ class CommandExtractor:
         """
         commands = []
         seen = set()
+        # Hoisted for the per-line / per-word loops below
+        known = self.KNOWN_COMMANDS
+        flag_pattern = self.FLAG_PATTERN
+        parse = self._parse_command_string
 
         for block in blocks:
             text = block["text"]
@@ -417,13 +518,11 @@ class CommandExtractor:
                         continue
 
                     # Strip shell prompts
-                    for prefix in ['$ ', '# ', '% ', '> ']:
-                        if line.startswith(prefix):
-                            line = line[len(prefix):]
-                            break
+                    if line[:2] in SHELL_PROMPTS:
+                        line = line[2:]
 
                     # Try parsing the line as a command
-                    cmd = self._parse_command_string(line)
+                    cmd = parse(line)
                     if cmd and cmd.command not in seen:
                         cmd.page = page
                         seen.add(cmd.command)
@@ -431,12 +530,12 @@ class CommandExtractor:
                         continue
 
                     # Strategy 2: Check if any known command appears in this line
-                    words = re.findall(r'\b[a-zA-Z_][\w.-]*\b', line)
-                    for word in words:
-                        if word in self.KNOWN_COMMANDS and word not in seen:
+                    flags = None  # the line's flags, found once if any word matches
+                    for word in WORD_RE.findall(line):
+                        if word in known and word not in seen:
                             # Extract flags from the rest of the line
-                            flags = self.FLAG_PATTERN.findall(line)
-                            flags = [f for f in flags if len(f) <= 20]
+                            if flags is None:
+                                flags = [f for f in flag_pattern.findall(line) if len(f) <= 20]
                             commands.append(ExtractedCommand(
                                 command=word,
                                 flags=flags[:10],
@@ -447,15 +546,15 @@ class CommandExtractor:
 
                 # Strategy 3: Even single-word mono text might be a command
                 stripped = text.strip()
-                if ' ' not in stripped and stripped in self.KNOWN_COMMANDS and stripped not in seen:
+                if ' ' not in stripped and stripped in known and stripped not in seen:
                     commands.append(ExtractedCommand(command=stripped, page=page))
                     seen.add(stripped)
 
             else:
                 # Non-mono text: check for inline backtick commands
-                backtick_cmds = re.findall(r'`([^`]+)`', text)
+                backtick_cmds = BACKTICK_RE.findall(text)
                 for cmd_text in backtick_cmds:
-                    cmd = self._parse_command_string(cmd_text)
+                    cmd = parse(cmd_text)
                     if cmd and cmd.command not in seen:
                         cmd.page = page
                         seen.add(cmd.command)
@@ -465,37 +564,42 @@ class CommandExtractor:
                     if not cmd:
                         for word in cmd_text.split():
                             clean = word.strip('`').split('/').pop()
-                            if clean in self.KNOWN_COMMANDS and clean not in seen:
+                            if clean in known and clean not in seen:
                                 commands.append(ExtractedCommand(
                                     command=clean, page=page, context=cmd_text[:80]
                                 ))
                                 seen.add(clean)
 
-        return sorted(commands, key=lambda c: c.command)
+        commands.sort(key=attrgetter("command"))
+        return commands
 
-    def _parse_command_string(self, cmd_string: str) -> ExtractedCommand | None:
+    @staticmethod
+    def _parse_command_string(cmd_string: str) -> ExtractedCommand | None:
         """
         Parse a command string like 'ls -la --color=auto /home'
-        into an ExtractedCommand.
+        into an ExtractedCommand. Callers may set page/context on the
+        result, so each call returns a fresh object.
+        """
+        parsed = CommandExtractor._parse_command_cached(cmd_string)
+        if parsed is None:
+            return None
+        return ExtractedCommand(command=parsed[0], flags=list(parsed[1]))
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_command_cached(cmd_string: str) -> tuple[str, tuple[str, ...]] | None:
+        """
+        (command, flags) for a command string, memoized — the same snippets
+        (`ls -la`, `grep -r`, ...) recur throughout a book.
         """
         cmd_string = cmd_string.strip()
         if not cmd_string:
             return None
 
-        # Handle pipes — take first command
-        if '|' in cmd_string:
-            parts = cmd_string.split('|')
-            cmd_string = parts[0].strip()
-
-        # Handle redirects
-        for redir in ['>>>', '>>', '>', '2>', '&>', '<<<', '<<', '<']:
-            if redir in cmd_string:
-                cmd_string = cmd_string.split(redir)[0].strip()
-
-        # Handle command chaining
-        for sep in ['&&', '||', ';']:
-            if sep in cmd_string:
-                cmd_string = cmd_string.split(sep)[0].strip()
+        # Handle pipes, redirects and chaining in one scan — take first command
+        sep = COMMAND_SEP_RE.search(cmd_string)
+        if sep:
+            cmd_string = cmd_string[:sep.start()].strip()
 
         tokens = cmd_string.split()
         if not tokens:
@@ -515,22 +619,22 @@ class CommandExtractor:
         # Validate it looks like a command
         cmd_name = first.split('/')[-1]  # Handle /usr/bin/ls → ls
 
-        if not re.match(r'^[a-zA-Z_][\w.-]*$', cmd_name):
+        if not cmd_name or cmd_name[0] not in CMD_FIRST_CHARS:
+            return None
+        rest = cmd_name.translate(CMD_PUNCT_DROP)
+        if rest and not rest.isalnum():  # isalnum() is what \w accepts, minus "_"
             return None
         if len(cmd_name) > 30:
             return None
 
         # Extract flags
-        flags = []
-        for token in tokens[1:]:
-            if token.startswith('-') and len(token) <= 25:
-                flags.append(token)
-
-        return ExtractedCommand(
-            command=cmd_name,
-            flags=flags
+        flags = tuple(
+            token for token in tokens[1:]
+            if token.startswith('-') and len(token) <= 25
         )
 
+        return cmd_name, flags
+
     def format_commands_table(self, commands: list[ExtractedCommand]) -> str:
         """Format extracted commands as a compact Markdown table with short descriptions."""
         if not commands:
@@ -543,3 +647,18 @@ class CommandExtractor:
             lines.append(f"| `{cmd.command}` | `{flags}` | {desc} |")
 
         return "\n".join(lines)
+
+
+def _is_word_char(ch: str) -> bool:
+    """True for characters the regex \\w class matches (word-boundary checks)."""
+    return ch.isalnum() or ch == '_'
+
+
+@lru_cache(maxsize=1)
+def _known_command_automaton():
+    """Aho-Corasick automaton over KNOWN_COMMANDS, built on first use."""
+    automaton = ahocorasick.Automaton()
+    for cmd_name in CommandExtractor.KNOWN_COMMANDS:
+        automaton.add_word(cmd_name, cmd_name)
+    automaton.make_automaton()
+    return automaton
@@ -42,6 +42,7 @@ class PDFParser:
         self.doc = fitz.open(pdf_path)
         self.total_pages = len(self.doc)
         self.filename = os.path.basename(pdf_path)
+        self._metadata: Optional[dict] = None
 
     @staticmethod
     def _is_mono_font(font_name: str) -> bool:
@@ -150,11 +151,7 @@ class PDFParser:
                 pass  # Fall through to basic extraction
 
         # Fallback: plain text
-        text = ""
-        for page_num in range(start_page, end_page + 1):
-            page = self.doc[page_num]
-            text += page.get_text("text") + "\n\n"
-        return text.strip()
+        return self._plain_page_text(start_page, end_page)
 
     def extract_text_plain(self, start_page: int, end_page: int) -> str:
         """
@@ -165,11 +162,14 @@ class PDFParser:
         start_page, end_page = self._normalize_page_range(start_page, end_page)
         if end_page < start_page:
             return ""
-        text = ""
-        for page_num in range(start_page, end_page + 1):
-            page = self.doc[page_num]
-            text += page.get_text("text") + "\n\n"
-        return text.strip()
+        return self._plain_page_text(start_page, end_page)
+
+    def _plain_page_text(self, start_page: int, end_page: int) -> str:
+        """Join the plain text of pages start..end in one pass (no repeated concatenation)."""
+        return "\n\n".join(
+            self.doc[page_num].get_text("text")
+            for page_num in range(start_page, end_page + 1)
+        ).strip()
 
     def extract_text_blocks(self, start_page: int, end_page: int) -> list[dict]:
         """
@@ -324,14 +324,16 @@ class PDFParser:
         return ""
 
     def get_metadata(self) -> dict:
-        """Get PDF metadata (title, author, etc.)."""
-        meta = self.doc.metadata
-        return {
-            "title": meta.get("title", self.filename),
-            "author": meta.get("author", "Unknown"),
-            "pages": self.total_pages,
-            "filename": self.filename
-        }
+        """Get PDF metadata (title, author, etc.). Read once, then cached."""
+        if self._metadata is None:
+            meta = self.doc.metadata
+            self._metadata = {
+                "title": meta.get("title", self.filename),
+                "author": meta.get("author", "Unknown"),
+                "pages": self.total_pages,
+                "filename": self.filename
+            }
+        return self._metadata
 
     def extract_images(
         self, start_page: int, end_page: int, min_size: int = 100, max_images: int = 15
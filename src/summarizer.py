@@ -6,7 +6,13 @@ Supports adjustable summary depth levels with content categorization.
 
 from google import genai
 from google.genai import types
+import hashlib
+import json
+import threading
 import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 from src.category_parser import get_category_tags_prompt
 
@@ -46,25 +52,169 @@ DEPTH_PROMPTS = {
 }
 
 
+EXTRACT_PROMPTS = {
+    "commands": (
+        "Extract ALL commands, flags, and syntax mentioned in this text. "
+        "For each command, provide:\n"
+        "- The command name and syntax\n"
+        "- What it does (brief description)\n"
+        "- Any flags/options mentioned with their purposes\n"
+        "- Example usage if given in the text\n"
+        "Format as a reference table or organized list."
+    ),
+    "terms": (
+        "Extract ALL key terms, definitions, and vocabulary from this text. "
+        "For each term, provide the definition or explanation given in the text. "
+        "Format as a glossary list."
+    ),
+    "concepts": (
+        "Extract ALL key concepts and ideas from this text. "
+        "For each concept, provide a brief explanation and how it relates "
+        "to other concepts mentioned. Organize hierarchically."
+    ),
+    "examples": (
+        "Extract ALL examples, code snippets, and practical demonstrations "
+        "from this text. For each, explain what it demonstrates and the "
+        "expected output or result."
+    ),
+}
+
+
+# Requests per minute a key may send, per model — free-tier quotas by
+# default; paid keys can pass a higher requests_per_minute
+DEFAULT_REQUESTS_PER_MINUTE = 15
+MODEL_REQUESTS_PER_MINUTE = {
+    "gemini-2.5-flash": 10,
+    "gemini-2.5-flash-lite": 15,
+    "gemini-2.5-pro": 5,
+}
+
+
+def default_requests_per_minute(model_name: str) -> int:
+    """Free-tier request rate for a model (DEFAULT_REQUESTS_PER_MINUTE if unlisted)."""
+    return MODEL_REQUESTS_PER_MINUTE.get(model_name, DEFAULT_REQUESTS_PER_MINUTE)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by all worker threads of a summarizer.
+    Allows a burst of `requests_per_minute` calls, then paces them evenly
+    so parallel section/media requests stay under the API quota instead
+    of tripping 429s and waiting out the retry delay.
+    """
+
+    def __init__(self, requests_per_minute: int):
+        self.capacity = float(requests_per_minute)
+        self.fill_rate = requests_per_minute / 60.0  # tokens per second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.fill_rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.fill_rate
+            time.sleep(wait)
+
+
+class TextStream:
+    """
+    Text chunks of one streamed response, for st.write_stream.
+    `interrupted` is set once the response failed after text was already
+    yielded — the joined output is then truncated and must not be cached.
+    Status lives here, per call, since summarizers are shared across sessions.
+    """
+
+    def __init__(self):
+        self.interrupted = False
+        self._chunks: Iterator[str] = iter(())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._chunks)
+
+
 class GeminiSummarizer:
     """Summarizes text using Google Gemini API with adjustable depth."""
 
-    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "gemini-2.5-flash",
+        requests_per_minute: int | None = None,
+    ):
         """
         Initialize the Gemini summarizer.
 
         Args:
             api_key: Google Gemini API key
             model_name: Gemini model to use (default: gemini-2.5-flash)
+            requests_per_minute: API quota to pace calls to (default: the
+                model's free-tier rate, see MODEL_REQUESTS_PER_MINUTE)
         """
         self.client = genai.Client(api_key=api_key)
         self.model_name = model_name
         self.max_retries = 3
         self.retry_base_delay = 40  # seconds — matches Gemini's suggested retry
+        self.max_concurrency = 8  # parallel section calls — keeps bursts under RPM quotas
+        self.media_batch_size = 8  # images/tables described per Vision request
+        self.media_concurrency = 4  # Vision batches in flight at once
+        self.max_query_tokens = 8000  # chapter text sent with Q&A / extraction prompts
+        self.max_query_chars = 30000  # fallback limit when tokens can't be counted
+        if requests_per_minute is None:
+            requests_per_minute = default_requests_per_minute(model_name)
+        self.rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+        self.section_cache_size = 256  # memoized section summaries kept in memory
+        # key -> ((chapter_title, section_title, text), summary)
+        self._section_cache: OrderedDict[str, tuple[tuple[str, str, str], str]] = OrderedDict()
+        self._section_cache_lock = threading.Lock()
+
+    def _section_cache_key(
+        self, source: tuple[str, str, str], depth: SummaryDepth, custom_instructions: str
+    ) -> str:
+        """
+        Content key for a section summary. source is (chapter_title,
+        section_title, text) — both titles are in the prompt, so identical
+        text under another heading gets its own entry.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for part in (self.model_name, depth.value, custom_instructions, *source):
+            h.update(part.encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _get_cached_section(self, key: str, source: tuple[str, str, str]) -> str | None:
+        """Return a memoized section summary, verifying titles and text match."""
+        with self._section_cache_lock:
+            entry = self._section_cache.get(key)
+            if entry is None or entry[0] != source:
+                return None
+            self._section_cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_section(self, key: str, source: tuple[str, str, str], summary: str):
+        """Memoize a section summary, evicting the least recently used entries."""
+        if not summary or summary.startswith("❌"):
+            return
+        with self._section_cache_lock:
+            self._section_cache[key] = (source, summary)
+            self._section_cache.move_to_end(key)
+            while len(self._section_cache) > self.section_cache_size:
+                self._section_cache.popitem(last=False)
 
     def _call_with_retry(self, config, contents) -> str:
         """Call Gemini API with automatic retry on rate limit (429) errors."""
         for attempt in range(self.max_retries):
+            self.rate_limiter.acquire()
             try:
                 response = self.client.models.generate_content(
                     model=self.model_name,
@@ -75,21 +225,77 @@ class GeminiSummarizer:
             except Exception as e:
                 error_str = str(e)
                 if "429" in error_str or "quota" in error_str.lower():
-                    wait = self.retry_base_delay * (attempt + 1)
-                    if attempt < self.max_retries - 1:
-                        print(f"⏳ Rate limited — waiting {wait}s before retry {attempt + 2}/{self.max_retries}...")
-                        time.sleep(wait)
-                    else:
-                        return (
-                            f"❌ Rate limit exceeded after {self.max_retries} retries. "
-                            f"Try switching to a different model (e.g. gemini-1.5-flash) "
-                            f"in the sidebar, or wait a minute and try again.\n\n"
-                            f"Error: {error_str[:200]}"
-                        )
+                    if not self._wait_before_retry(attempt):
+                        return self._rate_limit_message(error_str)
                 else:
                     return f"❌ Error: {error_str}"
         return "❌ Unexpected error during retry."
 
+    def _stream_with_retry(self, config, contents) -> TextStream:
+        """
+        Streaming variant of _call_with_retry — text chunks as they arrive.
+        Rate-limit retries only happen before the first chunk; errors are
+        yielded as a "❌" message like the non-streaming call returns them.
+        A failure after output has started also marks the stream interrupted.
+        """
+        stream = TextStream()
+        stream._chunks = self._stream_chunks(config, contents, stream)
+        return stream
+
+    def _stream_chunks(self, config, contents, stream: TextStream) -> Iterator[str]:
+        """Generator behind _stream_with_retry; flags `stream` if output is cut off."""
+        for attempt in range(self.max_retries):
+            self.rate_limiter.acquire()
+            started = False
+            try:
+                for chunk in self.client.models.generate_content_stream(
+                    model=self.model_name,
+                    contents=contents,
+                    config=config,
+                ):
+                    if chunk.text:
+                        started = True
+                        yield chunk.text
+                return
+            except Exception as e:
+                error_str = str(e)
+                if started:
+                    stream.interrupted = True
+                    yield f"\n\n❌ Error: {error_str}"
+                    return
+                if "429" in error_str or "quota" in error_str.lower():
+                    if not self._wait_before_retry(attempt):
+                        yield self._rate_limit_message(error_str)
+                        return
+                else:
+                    yield f"❌ Error: {error_str}"
+                    return
+        yield "❌ Unexpected error during retry."
+
+    def _request(self, config, contents, stream: bool = False) -> str | TextStream:
+        """Send a request — full text, or a chunk iterator for st.write_stream."""
+        if stream:
+            return self._stream_with_retry(config, contents)
+        return self._call_with_retry(config, contents)
+
+    def _wait_before_retry(self, attempt: int) -> bool:
+        """Sleep before retrying a rate-limited call; False when out of retries."""
+        if attempt >= self.max_retries - 1:
+            return False
+        wait = self.retry_base_delay * (attempt + 1)
+        print(f"⏳ Rate limited — waiting {wait}s before retry {attempt + 2}/{self.max_retries}...")
+        time.sleep(wait)
+        return True
+
+    def _rate_limit_message(self, error_str: str) -> str:
+        """User-facing error once rate-limit retries are exhausted."""
+        return (
+            f"❌ Rate limit exceeded after {self.max_retries} retries. "
+            f"Try switching to a different model (e.g. gemini-1.5-flash) "
+            f"in the sidebar, or wait a minute and try again.\n\n"
+            f"Error: {error_str[:200]}"
+        )
+
     def summarize(
         self,
         text: str,
@@ -97,7 +303,8 @@ class GeminiSummarizer:
         depth: SummaryDepth = SummaryDepth.STANDARD,
         custom_instructions: str = "",
         categorize: bool = True,
-    ) -> str:
+        stream: bool = False,
+    ) -> str | TextStream:
         """
         Summarize text with the specified depth level.
 
@@ -107,9 +314,10 @@ class GeminiSummarizer:
             depth: How detailed the summary should be
             custom_instructions: Any additional user instructions
             categorize: Whether to include category tags in headings
+            stream: Yield text chunks as they arrive instead of returning the whole summary
 
         Returns:
-            Formatted summary string
+            Formatted summary string (or a TextStream of its chunks when streaming)
         """
         depth_instruction = DEPTH_PROMPTS[depth]
 
@@ -140,15 +348,61 @@ class GeminiSummarizer:
 
         user_prompt += f"Text to summarize:\n\n{text}"
 
-        return self._call_with_retry(
+        return self._request(
             config=types.GenerateContentConfig(
                 temperature=0.3,
                 max_output_tokens=65536,
             ),
             contents=system_prompt + "\n\n" + user_prompt,
+            stream=stream,
         )
 
-    def ask_question(self, text: str, question: str, chapter_title: str = "") -> str:
+    def count_tokens(self, text: str) -> int | None:
+        """Token count of text for this model, or None if the API call fails."""
+        self.rate_limiter.acquire()  # an API request like any other — same quota
+        try:
+            return self.client.models.count_tokens(
+                model=self.model_name, contents=text
+            ).total_tokens
+        except Exception:
+            return None
+
+    @staticmethod
+    def _cut_at_whitespace(text: str, limit: int) -> str:
+        """First `limit` chars of text, ending at whitespace (never mid-word/token)."""
+        if len(text) <= limit:
+            return text
+        cut = max(text.rfind(" ", 0, limit), text.rfind("\n", 0, limit))
+        return text[:cut] if cut > 0 else text[:limit]
+
+    def truncate_for_prompt(self, text: str) -> str:
+        """
+        Trim chapter text to max_query_tokens for single-shot prompts.
+
+        Uses the model's tokenizer (count_tokens) so dense scripts like CJK
+        aren't over-sent and plain English isn't under-sent. The text is
+        counted once and cut at the measured chars-per-token ratio, with a
+        margin for uneven density. Falls back to max_query_chars if counting
+        fails.
+        """
+        # Every token is at least one character — short texts always fit
+        if len(text) <= self.max_query_tokens:
+            return text
+
+        total = self.count_tokens(text)
+        if total is None:
+            return self._cut_at_whitespace(text, self.max_query_chars)
+        if total <= self.max_query_tokens:
+            return text
+
+        # One count, then a proportional cut — aim a little under the budget
+        # since the kept prefix may be denser than the chapter average
+        limit = int(len(text) * self.max_query_tokens / total * 0.95)
+        return self._cut_at_whitespace(text, limit)
+
+    def ask_question(
+        self, text: str, question: str, chapter_title: str = "", stream: bool = False
+    ) -> str | TextStream:
         """
         Answer a specific question about the chapter text.
 
@@ -156,9 +410,10 @@ class GeminiSummarizer:
             text: The chapter text for context
             question: The user's question
             chapter_title: Optional chapter title
+            stream: Yield text chunks as they arrive
 
         Returns:
-            Answer string
+            Answer string (or a TextStream of its chunks when streaming)
         """
         system_prompt = (
             "You are StudySage, an expert study assistant. Answer the user's question "
@@ -174,12 +429,13 @@ class GeminiSummarizer:
         user_prompt += f"Chapter text:\n{text}\n\n"
         user_prompt += f"Question: {question}"
 
-        return self._call_with_retry(
+        return self._request(
             config=types.GenerateContentConfig(
                 temperature=0.2,
                 max_output_tokens=4096,
             ),
             contents=system_prompt + "\n\n" + user_prompt,
+            stream=stream,
         )
 
     def describe_image(
@@ -277,6 +533,147 @@ class GeminiSummarizer:
             ],
         )
 
+    def describe_media(self, media_items: list[dict], chapter_title: str = "") -> list[str]:
+        """
+        Describe several images/tables in a single Gemini Vision request.
+
+        The model returns a JSON array of {index, description} objects, mapped
+        back to the items by index; an item the response skips gets its label
+        instead. If the response isn't such an array at all, each item is
+        described individually. API errors are returned for every item.
+
+        Args:
+            media_items: Dicts from PDFParser.extract_images() / extract_table_images()
+                         Each has: {type, bytes, mime_type, label} (+ text for tables)
+            chapter_title: Chapter context
+
+        Returns:
+            One description per media item, in the same order
+        """
+        if not media_items:
+            return []
+
+        system_prompt = (
+            "You are StudySage, an expert study assistant. Below are numbered images "
+            "and tables from a textbook. Describe each one so a student understands "
+            "what it shows.\n\n"
+            "For images include what is depicted, the key information shown, and any "
+            "labels or legends (2-4 sentences). For tables include their purpose and "
+            "the key data points or patterns (3-5 sentences). Use Markdown formatting.\n\n"
+            "Respond with a JSON array containing exactly one object per item, in the "
+            'same order: [{"index": 1, "description": "..."}, ...]'
+        )
+
+        context = ""
+        if chapter_title:
+            context = f"These items are from the chapter: **{chapter_title}**\n\n"
+
+        contents: list = [system_prompt + "\n\n" + context]
+        for n, media in enumerate(media_items, start=1):
+            kind = "Table" if media["type"] == "table" else "Image"
+            item_text = f"Item {n} ({kind}, {media.get('label', '')}):"
+            if media["type"] == "table" and media.get("text"):
+                item_text += f"\nRaw table text (for reference):\n```\n{media['text'][:2000]}\n```"
+            contents.append(item_text)
+            contents.append(types.Part.from_bytes(data=media["bytes"], mime_type=media["mime_type"]))
+
+        response_text = self._call_with_retry(
+            config=types.GenerateContentConfig(
+                temperature=0.2,
+                max_output_tokens=1024 * len(media_items),
+                response_mime_type="application/json",
+                response_schema={
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "index": {"type": "INTEGER"},
+                            "description": {"type": "STRING"},
+                        },
+                        "required": ["index", "description"],
+                    },
+                },
+            ),
+            contents=contents,
+        )
+
+        # API-level failure — retrying per item would just hit the same error
+        if response_text and response_text.startswith("❌"):
+            return [response_text] * len(media_items)
+
+        try:
+            parsed = json.loads(response_text)
+        except (TypeError, ValueError):
+            parsed = None
+        if isinstance(parsed, list):
+            # Map by the 1-based index the model echoes back, not by position
+            by_index: dict[int, str] = {}
+            for item in parsed:
+                if not isinstance(item, dict) or not isinstance(item.get("description"), str):
+                    continue
+                try:
+                    index = int(item.get("index"))
+                except (TypeError, ValueError):
+                    continue
+                if 1 <= index <= len(media_items):
+                    by_index.setdefault(index, item["description"])
+            if by_index:
+                return [
+                    by_index.get(n) or media.get("label", "")
+                    for n, media in enumerate(media_items, start=1)
+                ]
+
+        # Fall back to one request per item
+        return [
+            self.describe_image(media["bytes"], chapter_title, media["mime_type"])
+            if media["type"] == "image"
+            else self.describe_table(
+                media["bytes"], media.get("text", ""), chapter_title, media["mime_type"]
+            )
+            for media in media_items
+        ]
+
+    def describe_media_batches(
+        self,
+        media_items: list[dict],
+        chapter_title: str = "",
+        progress_callback=None,
+    ) -> list[str]:
+        """
+        Describe all media in batches of media_batch_size, with up to
+        media_concurrency batches running in parallel.
+
+        Args:
+            media_items: Dicts from PDFParser.extract_images() / extract_table_images()
+            chapter_title: Chapter context
+            progress_callback: Optional callable(items_done, total_items)
+
+        Returns:
+            One description per media item, in the same order
+        """
+        if not media_items:
+            return []
+
+        size = self.media_batch_size
+        batches = [media_items[i:i + size] for i in range(0, len(media_items), size)]
+        results: list[list[str]] = [[] for _ in batches]
+
+        workers = max(1, min(self.media_concurrency, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(self.describe_media, batch, chapter_title): i
+                for i, batch in enumerate(batches)
+            }
+            items_done = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                items_done += len(batches[i])
+                if progress_callback:
+                    progress_callback(items_done, len(media_items))
+
+        return [description for batch in results for description in batch]
+
     def summarize_man_page(self, command: str, man_text: str) -> str:
         """
         Summarize a man page into a clear, simple reference.
@@ -328,7 +725,9 @@ class GeminiSummarizer:
             contents=system_prompt + "\n\n" + user_prompt,
         )
 
-    def extract_key_items(self, text: str, item_type: str = "commands", chapter_title: str = "") -> str:
+    def extract_key_items(
+        self, text: str, item_type: str = "commands", chapter_title: str = "", stream: bool = False
+    ) -> str | TextStream:
         """
         Extract specific types of items from the text (commands, terms, concepts, etc.)
 
@@ -336,38 +735,12 @@ class GeminiSummarizer:
             text: The chapter text
             item_type: What to extract — "commands", "terms", "concepts", "examples"
             chapter_title: Optional chapter title
+            stream: Yield text chunks as they arrive
 
         Returns:
-            Formatted list of extracted items
+            Formatted list of extracted items (or a TextStream of its chunks when streaming)
         """
-        type_prompts = {
-            "commands": (
-                "Extract ALL commands, flags, and syntax mentioned in this text. "
-                "For each command, provide:\n"
-                "- The command name and syntax\n"
-                "- What it does (brief description)\n"
-                "- Any flags/options mentioned with their purposes\n"
-                "- Example usage if given in the text\n"
-                "Format as a reference table or organized list."
-            ),
-            "terms": (
-                "Extract ALL key terms, definitions, and vocabulary from this text. "
-                "For each term, provide the definition or explanation given in the text. "
-                "Format as a glossary list."
-            ),
-            "concepts": (
-                "Extract ALL key concepts and ideas from this text. "
-                "For each concept, provide a brief explanation and how it relates "
-                "to other concepts mentioned. Organize hierarchically."
-            ),
-            "examples": (
-                "Extract ALL examples, code snippets, and practical demonstrations "
-                "from this text. For each, explain what it demonstrates and the "
-                "expected output or result."
-            ),
-        }
-
-        prompt = type_prompts.get(item_type, type_prompts["concepts"])
+        prompt = EXTRACT_PROMPTS.get(item_type, EXTRACT_PROMPTS["concepts"])
 
         system_prompt = (
             "You are StudySage, an expert study assistant. Extract and organize "
@@ -381,14 +754,74 @@ class GeminiSummarizer:
 
         user_prompt += f"{prompt}\n\nText:\n{text}"
 
-        return self._call_with_retry(
+        return self._request(
+            config=types.GenerateContentConfig(
+                temperature=0.1,
+                max_output_tokens=65536,
+            ),
+            contents=system_prompt + "\n\n" + user_prompt,
+            stream=stream,
+        )
+
+    def extract_all(self, text: str, chapter_title: str = "") -> dict[str, str]:
+        """
+        Extract commands, terms, concepts and examples in a single request.
+
+        The model returns a JSON object with one Markdown string per category.
+        If the response can't be parsed, each category is extracted separately
+        instead. API errors are returned for every category.
+
+        Args:
+            text: The chapter text
+            chapter_title: Optional chapter title
+
+        Returns:
+            Dict mapping each EXTRACT_PROMPTS key to its Markdown result
+        """
+        system_prompt = (
+            "You are StudySage, an expert study assistant. Extract and organize "
+            "information precisely from the provided text. Only include items "
+            "actually present in the text — do not add external knowledge.\n\n"
+            "Respond with a JSON object with one Markdown string per key:\n"
+            + "\n".join(f'- "{key}": {prompt}' for key, prompt in EXTRACT_PROMPTS.items())
+        )
+
+        user_prompt = ""
+        if chapter_title:
+            user_prompt += f"Chapter: **{chapter_title}**\n\n"
+        user_prompt += f"Text:\n{text}"
+
+        response_text = self._call_with_retry(
             config=types.GenerateContentConfig(
                 temperature=0.1,
                 max_output_tokens=65536,
+                response_mime_type="application/json",
+                response_schema={
+                    "type": "OBJECT",
+                    "properties": {key: {"type": "STRING"} for key in EXTRACT_PROMPTS},
+                    "required": list(EXTRACT_PROMPTS),
+                },
             ),
             contents=system_prompt + "\n\n" + user_prompt,
         )
 
+        # API-level failure — retrying per category would just hit the same error
+        if response_text and response_text.startswith("❌"):
+            return dict.fromkeys(EXTRACT_PROMPTS, response_text)
+
+        try:
+            parsed = json.loads(response_text)
+            if all(isinstance(parsed.get(key), str) for key in EXTRACT_PROMPTS):
+                return {key: parsed[key] for key in EXTRACT_PROMPTS}
+        except (TypeError, ValueError, AttributeError):
+            pass
+
+        # Fall back to one request per category
+        return {
+            key: self.extract_key_items(text, key, chapter_title)
+            for key in EXTRACT_PROMPTS
+        }
+
     def summarize_long_text(
         self,
         chunks: list[str],
@@ -447,7 +880,8 @@ class GeminiSummarizer:
             chapter_title: The parent chapter title
             depth: Summary depth level
             custom_instructions: Any additional user instructions
-            progress_callback: Optional callable(current, total, section_title)
+            progress_callback: Optional callable(completed, total, section_title),
+                               called on the calling thread as each section finishes
             categorize: Whether to include category tags in headings
 
         Returns:
@@ -459,29 +893,62 @@ class GeminiSummarizer:
                 categorize=categorize,
             )
 
-        # Phase 1: Summarize each section individually
-        section_summaries = []
-        for i, section in enumerate(sections):
-            if progress_callback:
-                progress_callback(i, len(sections), section["title"])
-
+        # Phase 1: Summarize each section individually. The calls are independent
+        # and I/O-bound, so fan them out — wall time tracks the slowest section
+        # instead of the sum of all of them.
+        def summarize_section(section: dict) -> str:
             section_prompt = (
                 f"This is section \"{section['title']}\" from the chapter "
                 f"\"{chapter_title}\". Summarize this section specifically.\n\n"
                 f"{section['text']}"
             )
-
-            summary = self.summarize(
+            return self.summarize(
                 section_prompt,
                 chapter_title=f"{chapter_title} → {section['title']}",
                 depth=depth,
                 custom_instructions=custom_instructions,
                 categorize=False,  # Don't tag individual sections
             )
-            section_summaries.append({
-                "title": section["title"],
-                "summary": summary,
-            })
+
+        # Identical sections (same chapter, heading and text) are summarized
+        # once and reused — within this chapter and on later runs via the memo.
+        sources = [(chapter_title, s["title"], s["text"]) for s in sections]
+        keys = [
+            self._section_cache_key(source, depth, custom_instructions)
+            for source in sources
+        ]
+        summaries: dict[str, str] = {}
+        pending: dict[str, int] = {}  # key -> first section index with that text
+        for i, key in enumerate(keys):
+            if key in summaries or key in pending:
+                continue
+            cached = self._get_cached_section(key, sources[i])
+            if cached is not None:
+                summaries[key] = cached
+            else:
+                pending[key] = i
+
+        n_done = len(sections) - len(pending)
+        workers = max(1, min(self.max_concurrency, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(summarize_section, sections[i]): key
+                for key, i in pending.items()
+            }
+            # Progress is reported from this thread as sections finish
+            for future in as_completed(futures):
+                key = futures[future]
+                i = pending[key]
+                summaries[key] = future.result()
+                self._cache_section(key, sources[i], summaries[key])
+                n_done += 1
+                if progress_callback and n_done < len(sections):
+                    progress_callback(n_done, len(sections), sections[i]["title"])
+
+        section_summaries = [
+            {"title": s["title"], "summary": summaries[key]}
+            for s, key in zip(sections, keys)
+        ]
 
         if progress_callback:
             progress_callback(len(sections), len(sections), "Combining sections...")